@@ -1,11 +1,31 @@
-import bcrypt
-from fastapi import APIRouter, Response, HTTPException, status, Query
+from fastapi import APIRouter, Request, Response, HTTPException, status, Query
+from peewee import IntegrityError
 from DTO.validationDTO import *
 from Databases.SQL.SQLDatabase import Accounts
+from config import ETAG_STORE_SIZE, ETAG_STORE_TTL
+from Databases.dataAccess import run_in_db_thread
 from DTO.accountDTO import AccountDTO
+from Utils.etag import ETagStore, conditional_json, not_modified_response
+from Utils.jsonResponse import render_json
+from Utils.links import LinkTemplate
+from Utils.passwordHashing import hash_password, verify_password
+from Utils.pubsub import pubsub
 
 router = APIRouter()
 
+account_etags = ETagStore(pubsub, "account_etags", ETAG_STORE_SIZE, ETAG_STORE_TTL)
+
+
+ACCOUNT_LINKS = LinkTemplate("/api/medicineProject/accounts", [
+    ("self", "", "GET"),
+    ("update_last_name", "/last_name", "PUT"),
+    ("update_first_name", "/first_name", "PUT"),
+    ("update_user_name", "/user_name", "PUT"),
+    ("update_user_email", "/user_email", "PUT"),
+    ("update_password", "/password", "PUT"),
+    ("delete account", "", "DELETE"),
+])
+
 
 def create_response_data(account: AccountDTO):
     response_data = {
@@ -15,19 +35,7 @@ def create_response_data(account: AccountDTO):
             "first_name": account.first_name,
             "user_name": account.user_name,
             "user_email": account.user_email,
-            "links": {
-                "self": {
-                    "href": f"/api/medicineProject/accounts/{account.id}", "type": "GET"
-                },
-                "update_last_name": {"href": f"/api/medicineProject/accounts/{account.id}/last_name", "type": "PUT"},
-                "update_first_name": {"href": f"/api/medicineProject/accounts/{account.id}/first_name", "type": "PUT"},
-                "update_user_name": {"href": f"/api/medicineProject/accounts/{account.id}/user_name", "type": "PUT"},
-                "update_user_email": {"href": f"/api/medicineProject/accounts/{account.id}/user_email", "type": "PUT"},
-                "update_password": {"href": f"/api/medicineProject/accounts/{account.id}/password", "type": "PUT"},
-                "delete account": {
-                    "href": f"/api/medicineProject/accounts/{account.id}", "type": "DELETE"
-                }
-            }
+            "links": ACCOUNT_LINKS.render(account.id)
         },
     }
 
@@ -39,25 +47,22 @@ async def create_account(
         account: AccountDTO,
         response: Response,
 ):
-    existing_account_email = Accounts.get_or_none(user_email=account.user_email)
-
-    if existing_account_email:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="An account with this email already exists")
-
     if is_valid_account(account):
-        hashed_password = bcrypt.hashpw(account.password.encode("utf-8"), bcrypt.gensalt(rounds=15))
-        new_account = Accounts.create(
-            last_name=account.last_name,
-            first_name=account.first_name,
-            user_name=account.user_name,
-            user_email=account.user_email,
-            password=hashed_password
-        )
-        if bcrypt.checkpw(account.password.encode("utf-8"), hashed_password):
-            print("Password is correct")
-        else:
-            print("Password is incorrect")
+        hashed_password = await hash_password(account.password)
+
+        # email-ul este unic, un cont duplicat este respins de indexul unic
+        try:
+            new_account = await run_in_db_thread(
+                Accounts.create,
+                last_name=account.last_name,
+                first_name=account.first_name,
+                user_name=account.user_name,
+                user_email=account.user_email,
+                password=hashed_password
+            )
+        except IntegrityError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="An account with this email already exists")
 
         response.status_code = status.HTTP_201_CREATED
 
@@ -76,15 +81,24 @@ async def create_account(
 
 
 @router.get("/api/medicineProject/accounts/{account_id}")
-async def get_account(account_id: int, response: Response):
+async def get_account(account_id: int, request: Request, response: Response):
+    # ETag-ul trimis anterior clientului este inca valid, deci nu mai este nevoie de interogare
+    etag = account_etags.match(request, account_id)
+
+    if etag is not None:
+        return not_modified_response(etag)
+
     try:
-        account = Accounts.get_by_id(account_id)
+        generation = account_etags.generation
+        account = await run_in_db_thread(Accounts.get_by_id, account_id)
 
         response.status_code = status.HTTP_200_OK
 
         response_data = create_response_data(account)
+        json_response = conditional_json(request, response, response_data)
+        account_etags.store(account_id, json_response.headers["etag"], generation)
 
-        return response_data
+        return json_response
 
     except Accounts.DoesNotExist:
         raise HTTPException(
@@ -121,7 +135,7 @@ async def get_accounts(
                     detail="Validation error in input data",
                 )
 
-            account = Accounts.get_by_user_email(user_email)
+            account = await run_in_db_thread(Accounts.get_by_user_email, user_email)
             response_data = create_response_data(account)
             return [response_data] if response_data else []
 
@@ -131,6 +145,8 @@ async def get_accounts(
                 detail="At least one of last_name, first_name, user_name, or user_email should be provided.",
             )
 
+        accounts = await run_in_db_thread(list, accounts)
+
         if not accounts:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -139,7 +155,7 @@ async def get_accounts(
 
         response.status_code = status.HTTP_200_OK
         response_data = [create_response_data(account) for account in accounts]
-        return response_data
+        return render_json(response, response_data)
 
     except Accounts.DoesNotExist:
         raise HTTPException(
@@ -156,11 +172,12 @@ async def update_account_last_name(
 ):
     try:
         if is_valid_name(updated_last_name):
-            account = Accounts.get_by_id(account_id)
+            account = await run_in_db_thread(Accounts.get_by_id, account_id)
 
             account.last_name = updated_last_name
 
-            account.save()
+            await run_in_db_thread(account.save)
+            account_etags.invalidate(account_id)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -185,11 +202,12 @@ async def update_account_first_name(
 ):
     try:
         if is_valid_name(updated_first_name):
-            account = Accounts.get_by_id(account_id)
+            account = await run_in_db_thread(Accounts.get_by_id, account_id)
 
             account.first_name = updated_first_name
 
-            account.save()
+            await run_in_db_thread(account.save)
+            account_etags.invalidate(account_id)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -213,11 +231,12 @@ async def update_account_user_name(
         response: Response,
 ):
     try:
-        account = Accounts.get_by_id(account_id)
+        account = await run_in_db_thread(Accounts.get_by_id, account_id)
 
         account.user_name = updated_user_name
 
-        account.save()
+        await run_in_db_thread(account.save)
+        account_etags.invalidate(account_id)
 
         response.status_code = status.HTTP_204_NO_CONTENT
         return None
@@ -236,25 +255,26 @@ async def update_account_user_email(
         response: Response,
 ):
     try:
-        account = Accounts.get_by_id(account_id)
-        conflicting_email_account = Accounts.get_or_none(user_email=updated_user_email)
+        account = await run_in_db_thread(Accounts.get_by_id, account_id)
 
-        if conflicting_email_account:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                                detail="Another account already has this email")
-        else:
-            if is_valid_email(updated_user_email):
-                account.user_email = updated_user_email
+        if is_valid_email(updated_user_email):
+            account.user_email = updated_user_email
 
-                account.save()
+            # nu pot fi mai multe conturi cu acelasi email (index unic)
+            try:
+                await run_in_db_thread(account.save)
+                account_etags.invalidate(account_id)
+            except IntegrityError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail="Another account already has this email")
 
-                response.status_code = status.HTTP_204_NO_CONTENT
-                return None
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    detail="Validation error in input data",
-                )
+            response.status_code = status.HTTP_204_NO_CONTENT
+            return None
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Validation error in input data",
+            )
 
     except Accounts.DoesNotExist:
         raise HTTPException(
@@ -271,23 +291,30 @@ async def update_account_password(
         response: Response,
 ):
     try:
-        account = Accounts.get_by_id(account_id)
+        account = await run_in_db_thread(Accounts.get_by_id, account_id)
+
+        password_matches, rehashed_password = await verify_password(current_password, account.password)
 
-        if bcrypt.checkpw(current_password.encode("utf-8"), account.password.encode("utf-8")):
-            print("Password is correct")
+        if password_matches:
             if is_valid_password(new_password):
-                account.password = new_password
-                account.save()
+                account.password = await hash_password(new_password)
+                await run_in_db_thread(account.save)
+                account_etags.invalidate(account_id)
 
                 response.status_code = status.HTTP_204_NO_CONTENT
                 return None
             else:
+                # parola curenta este pastrata, dar salvata cu costul bcrypt configurat acum
+                if rehashed_password is not None:
+                    account.password = rehashed_password
+                    await run_in_db_thread(account.save)
+                    account_etags.invalidate(account_id)
+
                 raise HTTPException(
                     status_code=status.HTTP_200_OK,
                     detail="New password is too weak",
                 )
         else:
-            print("Password is incorrect")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Current password is incorrect",
@@ -303,9 +330,10 @@ async def update_account_password(
 @router.delete("/api/medicineProject/accounts/{account_id}")
 async def delete_account(account_id: int, response: Response):
     try:
-        account = Accounts.get_by_id(account_id)
+        account = await run_in_db_thread(Accounts.get_by_id, account_id)
 
-        account.delete_instance()
+        await run_in_db_thread(account.delete_instance)
+        account_etags.invalidate(account_id)
 
         response.status_code = status.HTTP_204_NO_CONTENT
 
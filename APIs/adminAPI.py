@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Response, status, HTTPException, Query, Header
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import PlainTextResponse
+
+from Databases.SQL.SQLDatabase import get_pool_stats
+from Databases.SQL.doctorCache import doctor_cache
+from Databases.SQL.patientCache import patient_cache
+from config import PROFILER_TOP_FUNCTIONS, METRICS_DIRECTORY
+from Utils.metrics import metrics, METRICS_CONTENT_TYPE, render_shared_metrics
+from Utils.profiling import is_valid_profile_token, list_profiles, load_profile, render_profile_text
+
+router = APIRouter()
+
+
+@router.get("/api/medicineProject/admin/pool")
+async def get_connection_pool_stats(response: Response):
+    response.status_code = status.HTTP_200_OK
+
+    response_data = {
+        "mysql": get_pool_stats(),
+    }
+
+    return response_data
+
+
+@router.get("/api/medicineProject/admin/cache")
+async def get_cache_stats(response: Response):
+    response.status_code = status.HTTP_200_OK
+
+    response_data = {
+        "doctors": doctor_cache.get_stats(),
+        "patients": patient_cache.get_stats(),
+    }
+
+    return response_data
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # format text Prometheus; cu METRICS_DIRECTORY valorile sunt adunate de la toti worker-ii, altfel sunt ale
+    # procesului care a primit request-ul
+    if not METRICS_DIRECTORY:
+        return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+    content = await run_in_threadpool(render_shared_metrics, METRICS_DIRECTORY, metrics.snapshot())
+
+    return Response(content=content, media_type=METRICS_CONTENT_TYPE)
+
+
+def check_profile_token(profile_token):
+    # profilurile contin detalii despre cod si interogari, deci sunt cerute cu acelasi token semnat care porneste
+    # profilarea
+    if profile_token is None or not is_valid_profile_token(profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="A valid profile token is required",
+        )
+
+
+@router.get("/api/medicineProject/admin/profiles")
+async def get_profiles(response: Response, profile_token: str = Header(None, alias="X-Profile-Token")):
+    check_profile_token(profile_token)
+
+    response.status_code = status.HTTP_200_OK
+
+    return {"profiles": await run_in_threadpool(list_profiles)}
+
+
+@router.get("/api/medicineProject/admin/profiles/{profile_id}")
+async def get_profile(
+        profile_id: str,
+        response: Response,
+        top: int = Query(PROFILER_TOP_FUNCTIONS, ge=1, le=1000, title="Top",
+                         description="Number of functions listed, by cumulative time."),
+        output_format: str = Query("json", alias="format", pattern="^(json|text)$", title="Format",
+                                   description="json (top functions and call tree) or text (pstats report)."),
+        profile_token: str = Header(None, alias="X-Profile-Token"),
+):
+    check_profile_token(profile_token)
+
+    # citirea si agregarea profilului se fac in afara event loop-ului
+    if output_format == "text":
+        report = await run_in_threadpool(render_profile_text, profile_id, top)
+
+        if report is not None:
+            return PlainTextResponse(report)
+    else:
+        profile = await run_in_threadpool(load_profile, profile_id, top)
+
+        if profile is not None:
+            response.status_code = status.HTTP_200_OK
+            return profile
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Profile not found",
+    )
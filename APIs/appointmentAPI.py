@@ -1,54 +1,96 @@
-from fastapi import APIRouter, Response, HTTPException, status, Header
+import base64
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Request, Response, HTTPException, status, Header, Query
+from peewee import IntegrityError
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
 
+from config import APPOINTMENT_PAGE_SIZE, APPOINTMENT_MAX_PAGE_SIZE, APPOINTMENT_BULK_BATCH_SIZE, ETAG_STORE_SIZE, \
+    ETAG_STORE_TTL
+from DTO.appointmentDTO import AppointmentStatusUpdateDTO
 from DTO.validationDTO import *
-from Databases.SQL.SQLDatabase import Appointments, Patients, Doctors
+from Databases.SQL.SQLDatabase import Appointments, Patients, Doctors, db
+from Databases.SQL.doctorCache import doctor_cache
+from Databases.SQL.patientCache import patient_cache
+from Databases.dataAccess import run_in_db_thread
+from Utils.bulkImport import parse_import_body, format_validation_errors, create_row_error, chunked, \
+    create_import_report
+from Utils.etag import ETagStore, conditional_json, not_modified_response
+from Utils.jsonResponse import render_json
+from Utils.links import LinkTemplate
+from Utils.pubsub import pubsub
 
 router = APIRouter()
 
+appointment_etags = ETagStore(pubsub, "appointment_etags", ETAG_STORE_SIZE, ETAG_STORE_TTL)
+
+
+# update_status pastreaza sufixul /id_patient din raspunsurile existente
+APPOINTMENT_LINKS = LinkTemplate("/api/medicineProject/appointment", [
+    ("self", "", "GET"),
+    ("update_id_patient", "/id_patient", "PUT"),
+    ("update_id_doctor", "/id_doctor", "PUT"),
+    ("update_date", "/date", "PUT"),
+    ("update_status", "/id_patient", "PUT"),
+    ("delete appointment", "", "DELETE"),
+])
+
 
 def create_response_data(appointment: AppointmentDTO):
+    # se folosesc valorile brute ale cheilor straine (id_patient_id, id_doctor_id); accesarea appointment.id_patient
+    # sau appointment.id_doctor ar incarca pacientul si doctorul cu cate o interogare separata pentru fiecare programare
     response_data = {
         "appointment": {
             "id": appointment.id,
-            "id_patient": appointment.id_patient,
-            "id_doctor": appointment.id_doctor,
+            "id_patient": appointment.id_patient_id,
+            "id_doctor": appointment.id_doctor_id,
             "date": appointment.date,
             "status": appointment.status,
-            "links": {
-                "self": {
-                    "href": f"/api/medicineProject/appointment/{appointment.id}", "type": "GET"
-                },
-                "update_id_patient": {
-                    "href": f"/api/medicineProject/appointment/{appointment.id}/id_patient", "type": "PUT"
-                },
-                "update_id_doctor": {
-                    "href": f"/api/medicineProject/appointment/{appointment.id}/id_doctor", "type": "PUT"
-                },
-                "update_date": {
-                    "href": f"/api/medicineProject/appointment/{appointment.id}/date", "type": "PUT"
-                },
-                "update_status": {
-                    "href": f"/api/medicineProject/appointment/{appointment.id}/id_patient", "type": "PUT"
-                },
-                "delete appointment": {
-                    "href": f"/api/medicineProject/appointment/{appointment.id}", "type": "DELETE"
-                }
-            }
+            "links": APPOINTMENT_LINKS.render(appointment.id)
         },
     }
 
     return response_data
 
 
+def encode_appointment_cursor(appointment):
+    cursor = f"{appointment.date}|{appointment.id}"
+
+    return base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii")
+
+
+def decode_appointment_cursor(cursor):
+    try:
+        date, appointment_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rsplit("|", 1)
+
+        return date, int(appointment_id)
+
+    except ValueError:
+        raise ValueError(f"Invalid appointment cursor: {cursor}")
+
+
+async def find_missing_reference(patient_cnp, doctor_id):
+    # apelat doar dupa ce cheia straina a respins o scriere; citirea din baza de date scoate si intrarea veche din
+    # cache-ul acestui proces
+    if patient_cnp is not None and await patient_cache.get_current(patient_cnp) is None:
+        return "Invalid patient ID"
+
+    if doctor_id is not None:
+        await doctor_cache.get_current_by_id(doctor_id)
+
+    return "Invalid doctor ID"
+
+
 @router.post("/api/medicineProject/appointments/")
 async def create_appointment(
         appointment: AppointmentDTO,
         response: Response,
 ):
     if is_valid_appointment(appointment):
-        patient = Patients.get_or_none(cnp=appointment.id_patient)
-        doctor = Doctors.get_or_none(id=appointment.id_doctor)
+        patient = await patient_cache.get(appointment.id_patient)
+        doctor = await doctor_cache.get_by_id(appointment.id_doctor)
 
         if patient is None:
             response.status_code = status.HTTP_404_NOT_FOUND
@@ -63,12 +105,21 @@ async def create_appointment(
                 detail="Invalid doctor ID",
             )
         else:
-            new_appointment = Appointments.create(
-                id_patient=patient,
-                id_doctor=doctor,
-                date=appointment.date,
-                status=appointment.status,
-            )
+            # pacientul si doctorul vin din cache; daca unul a fost sters intre timp de alt worker, scrierea este
+            # respinsa de cheia straina
+            try:
+                new_appointment = await run_in_db_thread(
+                    Appointments.create,
+                    id_patient=patient,
+                    id_doctor=doctor,
+                    date=appointment.date,
+                    status=appointment.status,
+                )
+            except IntegrityError:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=await find_missing_reference(appointment.id_patient, appointment.id_doctor),
+                )
 
             response.status_code = status.HTTP_201_CREATED
 
@@ -90,16 +141,121 @@ async def create_appointment(
     return response_data
 
 
+def validate_appointment_rows(body, content_type):
+    rows = parse_import_body(body, content_type)
+    valid_rows = []
+    errors = []
+
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            appointment = AppointmentDTO.model_validate(row)
+        except ValidationError as error:
+            errors.append(create_row_error(row_number, status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                           format_validation_errors(error)))
+            continue
+
+        if not is_valid_appointment(appointment):
+            errors.append(create_row_error(row_number, status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                           ["Validation error in input data"]))
+            continue
+
+        valid_rows.append((row_number, appointment))
+
+    return len(rows), valid_rows, errors
+
+
+def insert_appointment_batch(batch):
+    # pacientii si doctorii referiti de tot lotul sunt verificati cu cate o singura interogare IN
+    existing_patients = Patients.find_existing(Patients.cnp, {str(appointment.id_patient) for _, appointment in batch})
+    existing_doctors = Doctors.find_existing(Doctors.id, {appointment.id_doctor for _, appointment in batch})
+    new_appointments = []
+    errors = []
+
+    for row_number, appointment in batch:
+        row_errors = []
+
+        if str(appointment.id_patient) not in existing_patients:
+            row_errors.append("Invalid patient ID")
+        if appointment.id_doctor not in existing_doctors:
+            row_errors.append("Invalid doctor ID")
+
+        if row_errors:
+            errors.append(create_row_error(row_number, status.HTTP_404_NOT_FOUND, row_errors))
+        else:
+            new_appointments.append((row_number, {
+                "id_patient": str(appointment.id_patient),
+                "id_doctor": appointment.id_doctor,
+                "date": appointment.date,
+                "status": appointment.status,
+            }))
+
+    if not new_appointments:
+        return 0, errors
+
+    try:
+        with db.atomic():
+            Appointments.insert_many([appointment for _, appointment in new_appointments]).execute()
+
+        return len(new_appointments), errors
+
+    except IntegrityError:
+        # un pacient sau un doctor a fost sters intre verificare si INSERT; lotul este reluat rand cu rand pentru a-l
+        # gasi
+        created = 0
+
+        for row_number, appointment in new_appointments:
+            try:
+                with db.atomic():
+                    Appointments.insert(appointment).execute()
+                created += 1
+            except IntegrityError:
+                errors.append(create_row_error(row_number, status.HTTP_404_NOT_FOUND, ["Invalid patient or doctor ID"]))
+
+        return created, errors
+
+
+@router.post("/api/medicineProject/appointments/bulk/")
+async def create_appointments(request: Request, response: Response):
+    try:
+        row_count, valid_rows, errors = await run_in_threadpool(validate_appointment_rows, await request.body(),
+                                                                request.headers.get("content-type", ""))
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(error),
+        )
+
+    created = 0
+
+    for batch in chunked(valid_rows, APPOINTMENT_BULK_BATCH_SIZE):
+        batch_created, batch_errors = await run_in_db_thread(insert_appointment_batch, batch)
+        created += batch_created
+        errors.extend(batch_errors)
+
+    response.status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+
+    return render_json(response, create_import_report(row_count, created, errors))
+
+
 @router.get("/api/medicineProject/appointments/{appointment_id}")
-async def get_appointment(appointment_id: int, response: Response):
+async def get_appointment(appointment_id: int, request: Request, response: Response):
+    # ETag-ul trimis anterior clientului este inca valid, deci nu mai este nevoie de interogare
+    etag = appointment_etags.match(request, appointment_id)
+
+    if etag is not None:
+        return not_modified_response(etag)
+
     try:
-        appointment = Appointments.get_by_id(appointment_id)
+        generation = appointment_etags.generation
+        appointment = await run_in_db_thread(Appointments.get_by_id, appointment_id)
 
         response.status_code = status.HTTP_200_OK
 
         response_data = create_response_data(appointment)
+        json_response = conditional_json(request, response, response_data)
+        appointment_etags.store(appointment_id, json_response.headers["etag"], generation)
 
-        return response_data
+        return json_response
     except Appointments.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -108,10 +264,41 @@ async def get_appointment(appointment_id: int, response: Response):
 
 
 @router.get("/api/medicineProject/appointments/")
-async def get_all_appointments(response: Response):
-    appointments = Appointments.select()
+async def get_all_appointments(
+        request: Request,
+        response: Response,
+        doctor_id: int = Query(None, title="Doctor ID", description="ID of the doctor."),
+        patient_cnp: str = Query(None, title="Patient CNP", description="CNP of the patient."),
+        appointment_status: str = Query(None, alias="status", title="Status",
+                                        description="Status of the appointment."),
+        date_from: str = Query(None, title="Date From", description="First date included, as YYYY-MM-DD."),
+        date_to: str = Query(None, title="Date To", description="Last date included, as YYYY-MM-DD."),
+        limit: int = Query(APPOINTMENT_PAGE_SIZE, ge=1, le=APPOINTMENT_MAX_PAGE_SIZE, title="Limit",
+                           description="Maximum number of appointments returned."),
+        after: str = Query(None, title="After", description="Cursor taken from the next link of the previous page."),
+):
+    if ((patient_cnp is not None and not is_valid_cnp(patient_cnp)) or
+            (appointment_status is not None and not is_valid_status(appointment_status)) or
+            (date_from is not None and not is_valid_date(date_from)) or
+            (date_to is not None and not is_valid_date(date_to))):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Validation error in input data",
+        )
+
+    try:
+        after_key = decode_appointment_cursor(after) if after else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid pagination cursor",
+        )
 
-    if appointments.count() == 0:
+    # se cere o programare in plus pentru a sti daca exista o pagina urmatoare, fara o interogare de tip count
+    appointments = await run_in_db_thread(list, Appointments.filter_page(doctor_id, patient_cnp, appointment_status,
+                                                                         date_from, date_to, after_key, limit + 1))
+
+    if len(appointments) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No appointments found",
@@ -119,10 +306,16 @@ async def get_all_appointments(response: Response):
     else:
         response.status_code = status.HTTP_200_OK
 
-        appointments_data = [create_response_data(appointment) for appointment in appointments]
+        appointments_data = [create_response_data(appointment) for appointment in appointments[:limit]]
         response_data = {"doctors": appointments_data}
 
-        return response_data
+        if len(appointments) > limit:
+            query = urlencode({**request.query_params, "after": encode_appointment_cursor(appointments[limit - 1])})
+            response_data["_links"] = {
+                "next": {"href": f"{request.url.path}?{query}", "type": "GET"}
+            }
+
+        return render_json(response, response_data)
 
 
 @router.put("/api/medicineProject/appointments/{appointment_id}/id_patient")
@@ -132,7 +325,7 @@ async def update_appointment_id_patient(
         response: Response,
 ):
     try:
-        patient = Patients.get_or_none(id=updated_id_patient)
+        patient = await patient_cache.get(updated_id_patient)
 
         if patient is None:
             response.status_code = status.HTTP_404_NOT_FOUND
@@ -141,11 +334,18 @@ async def update_appointment_id_patient(
                 detail="Invalid patient ID",
             )
         else:
-            appointment = Appointments.get_by_id(appointment_id)
+            appointment = await run_in_db_thread(Appointments.get_by_id, appointment_id)
 
             appointment.id_patient = updated_id_patient
 
-            appointment.save()
+            try:
+                await run_in_db_thread(appointment.save)
+            except IntegrityError:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=await find_missing_reference(updated_id_patient, None),
+                )
+            appointment_etags.invalidate(appointment_id)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return JSONResponse(content=None, status_code=status.HTTP_204_NO_CONTENT)
@@ -164,7 +364,7 @@ async def update_appointment_doctor_id(
         response: Response,
 ):
     try:
-        doctor = Doctors.get_or_none(id=updated_doctor_id)
+        doctor = await doctor_cache.get_by_id(updated_doctor_id)
 
         if doctor is None:
             response.status_code = status.HTTP_404_NOT_FOUND
@@ -173,11 +373,18 @@ async def update_appointment_doctor_id(
                 detail="Invalid doctor ID",
             )
         else:
-            appointment = Appointments.get_by_id(appointment_id)
+            appointment = await run_in_db_thread(Appointments.get_by_id, appointment_id)
 
             appointment.id_doctor = updated_doctor_id
 
-            appointment.save()
+            try:
+                await run_in_db_thread(appointment.save)
+            except IntegrityError:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=await find_missing_reference(None, updated_doctor_id),
+                )
+            appointment_etags.invalidate(appointment_id)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return JSONResponse(content=None, status_code=status.HTTP_204_NO_CONTENT)
@@ -197,11 +404,12 @@ async def update_appointment_date(
 ):
     try:
         if is_valid_date(updated_date):
-            appointment = Appointments.get_by_id(appointment_id)
+            appointment = await run_in_db_thread(Appointments.get_by_id, appointment_id)
 
             appointment.date = updated_date
 
-            appointment.save()
+            await run_in_db_thread(appointment.save)
+            appointment_etags.invalidate(appointment_id)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return JSONResponse(content=None, status_code=status.HTTP_204_NO_CONTENT)
@@ -227,11 +435,12 @@ async def update_appointment_status(
 ):
     try:
         if is_valid_status(updated_status):
-            appointment = Appointments.get_by_id(appointment_id)
+            appointment = await run_in_db_thread(Appointments.get_by_id, appointment_id)
 
             if appointment.status != updated_status:
                 appointment.status = updated_status
-                appointment.save()
+                await run_in_db_thread(appointment.save)
+                appointment_etags.invalidate(appointment_id)
                 response.status_code = status.HTTP_204_NO_CONTENT
                 return JSONResponse(content=None, status_code=status.HTTP_204_NO_CONTENT)
             else:
@@ -254,12 +463,45 @@ async def update_appointment_status(
         )
 
 
+@router.put("/api/medicineProject/appointments/status/")
+async def update_appointments_status(
+        status_update: AppointmentStatusUpdateDTO,
+        response: Response,
+):
+    if ((not is_valid_status(status_update.status)) or
+            (status_update.patient_cnp is not None and not is_valid_cnp(status_update.patient_cnp)) or
+            (status_update.date_from is not None and not is_valid_date(status_update.date_from)) or
+            (status_update.date_to is not None and not is_valid_date(status_update.date_to))):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Validation error in input data",
+        )
+
+    # fara niciun criteriu de selectie s-ar modifica toate programarile
+    if (not status_update.ids and status_update.doctor_id is None and status_update.patient_cnp is None and
+            status_update.date_from is None and status_update.date_to is None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one of ids, doctor_id, patient_cnp, date_from or date_to should be provided.",
+        )
+
+    updated = await run_in_db_thread(Appointments.update_status, status_update.status, status_update.ids or None,
+                                     status_update.doctor_id, status_update.patient_cnp, status_update.date_from,
+                                     status_update.date_to)
+    appointment_etags.invalidate_all()
+
+    response.status_code = status.HTTP_200_OK
+
+    return {"updated": updated}
+
+
 @router.delete("/api/medicineProject/appointments/{appointment_id}")
 async def delete_appointment(appointment_id: int, response: Response):
     try:
-        appointment = Appointments.get_by_id(appointment_id)
+        appointment = await run_in_db_thread(Appointments.get_by_id, appointment_id)
 
-        appointment.delete_instance()
+        await run_in_db_thread(appointment.delete_instance)
+        appointment_etags.invalidate(appointment_id)
 
         response.status_code = status.HTTP_204_NO_CONTENT
 
@@ -1,70 +1,110 @@
-from fastapi import APIRouter, Response, HTTPException, status
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Request, Response, HTTPException, status, Query
+from pydantic import ValidationError
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
 
+from config import CONSULTATION_PAGE_SIZE, CONSULTATION_MAX_PAGE_SIZE, CONSULTATION_EXPORT_BATCH_SIZE, \
+    CONSULTATION_BULK_BATCH_SIZE
 from DTO.validationDTO import *
 from Databases.SQL.SQLDatabase import Patients, Doctors
-from Databases.NoSQL.consultationDatabase import *
+from Databases.NoSQL.consultationDatabase import encode_consultation_cursor, decode_consultation_cursor, \
+    build_consultation_export_filter, build_consultation_export_row, build_consultation_document, \
+    DUPLICATE_KEY_ERROR_CODE
+from Databases.NoSQL.consultationRepository import consultation_repository
+from Databases.NoSQL.consultationWriteBuffer import consultation_write_buffer
+from Databases.SQL.doctorCache import doctor_cache
+from Databases.SQL.patientCache import patient_cache
+from Databases.dataAccess import run_in_db_thread
+from Utils.bulkImport import parse_import_body, format_validation_errors, create_row_error, chunked, \
+    create_import_report
+from Utils.exportStreams import ndjson_stream, export_response
+from Utils.jsonResponse import render_json
+from Utils.links import LinkTemplate
 
 router = APIRouter()
 
 
+CONSULTATION_LINKS = LinkTemplate("/api/medicineProject/consultation", [
+    ("self", "", "GET"),
+    ("update_id_patient", "/id_patient", "PUT"),
+    ("update_id_doctor", "/id_doctor", "PUT"),
+    ("update_date", "/date", "PUT"),
+    ("update_diagnostic", "/diagnostic", "PUT"),
+    ("update_investigations", "/investigations", "PUT"),
+    ("delete consultation", "", "DELETE"),
+])
+
+
 def create_response_data(consultations):
     response_data = {}
-    index = 0
-
-    for consultation in consultations:
-        response_data.update({
-            f"consultation {str(index + 1)}": {
-                "id": str(consultation['_id']),
-                "id_patient": consultation['patient_id'],
-                "id_doctor": consultation['doctor_id'],
-                "date": consultation['date'],
-                "diagnostic": consultation['diagnostic'],
-                "links": {
-                    "self": {
-                        "href": f"/api/medicineProject/consultation/{str(consultation['_id'])}", "type": "GET"
-                    },
-                    "update_id_patient": {
-                        "href": f"/api/medicineProject/consultation/{str(consultation['_id'])}/id_patient",
-                        "type": "PUT"
-                    },
-                    "update_id_doctor": {
-                        "href": f"/api/medicineProject/consultation/{str(consultation['_id'])}/id_doctor",
-                        "type": "PUT"
-                    },
-                    "update_date": {
-                        "href": f"/api/medicineProject/consultation/{str(consultation['_id'])}/date",
-                        "type": "PUT"
-                    },
-                    "update_diagnostic": {
-                        "href": f"/api/medicineProject/consultation/{str(consultation['_id'])}/diagnostic",
-                        "type": "PUT"
-                    },
-                    "update_investigations": {
-                        "href": f"/api/medicineProject/consultation/{str(consultation['_id'])}/investigations",
-                        "type": "PUT"
-                    },
-                    "delete consultation": {
-                        "href": f"/api/medicineProject/consultation/{str(consultation['_id'])}", "type": "DELETE"
-                    }
-                }
-            }
-        })
-        index += 1
+
+    for index, consultation in enumerate(consultations, start=1):
+        consultation_id = str(consultation['_id'])
+
+        response_data[f"consultation {index}"] = {
+            "id": consultation_id,
+            "id_patient": consultation['patient_id'],
+            "id_doctor": consultation['doctor_id'],
+            "date": consultation['date'],
+            "diagnostic": consultation['diagnostic'],
+            "links": CONSULTATION_LINKS.render(consultation_id)
+        }
 
     return response_data
 
 
+def add_next_page_link(response_data, request: Request, next_cursor):
+    if next_cursor is not None:
+        query = urlencode({**request.query_params, "after": next_cursor})
+        response_data["_links"] = {
+            "next": {"href": f"{request.url.path}?{query}", "type": "GET"}
+        }
+
+    return response_data
+
+
+async def get_consultations_page(searched, attribute, limit, after):
+    try:
+        after_key = decode_consultation_cursor(after) if after else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid pagination cursor",
+        )
+
+    # se cere un element in plus pentru a sti daca exista o pagina urmatoare, fara o interogare de tip count
+    consultations = await consultation_repository.get_consultations_by_attribute(searched, attribute, limit + 1,
+                                                                                 after_key)
+    next_cursor = None
+
+    if len(consultations) > limit:
+        consultations = consultations[:limit]
+        next_cursor = encode_consultation_cursor(consultations[-1])
+
+    return consultations, next_cursor
+
+
+async def is_duplicate_consultation(patient_id, doctor_id, date, diagnostic):
+    # cu indexul unic duplicatele sunt respinse de MongoDB cu DuplicateKeyError; fara el sunt cautate inainte
+    if consultation_repository.has_unique_index:
+        return False
+
+    return bool(await consultation_repository.get_consultation_from_database(patient_id, doctor_id, date, diagnostic))
+
+
 @router.post("/api/medicineProject/consultations/")
 async def create_consultation(
         consultation: ConsultationDTO,
         response: Response,
 ):
-    consultation_results = get_consultation_from_database(consultation.id_patient, consultation.id_doctor,
-                                                          consultation.date, consultation.diagnostic)
     if is_valid_consultation(consultation):
-        patient = Patients.get_or_none(cnp=consultation.id_patient)
-        doctor = Doctors.get_or_none(id=consultation.id_doctor)
+        # pacientii si doctorii stersi de alt worker raman in cache cel mult PATIENT_CACHE_TTL, respectiv
+        # DOCTOR_CACHE_TTL secunde
+        patient = await patient_cache.get(consultation.id_patient)
+        doctor = await doctor_cache.get_by_id(consultation.id_doctor)
 
         if patient is None:
             raise HTTPException(
@@ -76,20 +116,28 @@ async def create_consultation(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Invalid doctor ID",
             )
-        elif len(consultation_results) != 0:
+        elif await is_duplicate_consultation(consultation.id_patient, consultation.id_doctor, consultation.date,
+                                             consultation.diagnostic):
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="A consultation with these parameters already exits!",
             )
         else:
-            response.status_code = status.HTTP_201_CREATED
+            # inserarea trece prin bufferul de scriere, care grupeaza consultatiile create concurent intr-un singur
+            # insert_many
+            try:
+                new_consultation = await consultation_write_buffer.add(build_consultation_document(
+                    consultation.id_patient, consultation.id_doctor, consultation.date, consultation.diagnostic,
+                    consultation.investigations))
+            except DuplicateKeyError:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A consultation with these parameters already exits!",
+                )
 
-            add_consultation_document(consultation.id_patient, consultation.id_doctor, consultation.date,
-                                      consultation.diagnostic, consultation.investigations)
-            new_consultation = get_consultation_from_database(consultation.id_patient, consultation.id_doctor,
-                                                              consultation.date, consultation.diagnostic)
+            response.status_code = status.HTTP_201_CREATED
 
-            response_data = create_response_data(new_consultation)
+            response_data = create_response_data([new_consultation])
 
     else:
         response.status_code = status.HTTP_200_OK
@@ -108,10 +156,102 @@ async def create_consultation(
     return response_data
 
 
+def validate_consultation_rows(body, content_type):
+    rows = parse_import_body(body, content_type)
+    valid_rows = []
+    errors = []
+
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            consultation = ConsultationDTO.model_validate(row)
+        except ValidationError as error:
+            errors.append(create_row_error(row_number, status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                           format_validation_errors(error)))
+            continue
+
+        if not is_valid_consultation(consultation):
+            errors.append(create_row_error(row_number, status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                           ["Validation error in input data"]))
+            continue
+
+        valid_rows.append((row_number, consultation))
+
+    return len(rows), valid_rows, errors
+
+
+def find_consultation_references(batch):
+    patients = Patients.find_existing(Patients.cnp, {str(consultation.id_patient) for _, consultation in batch})
+    doctors = Doctors.find_existing(Doctors.id, {consultation.id_doctor for _, consultation in batch})
+
+    return patients, doctors
+
+
+@router.post("/api/medicineProject/consultations/bulk/")
+async def create_consultations(request: Request, response: Response):
+    try:
+        row_count, valid_rows, errors = await run_in_threadpool(validate_consultation_rows, await request.body(),
+                                                                request.headers.get("content-type", ""))
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(error),
+        )
+
+    created = 0
+
+    for batch in chunked(valid_rows, CONSULTATION_BULK_BATCH_SIZE):
+        existing_patients, existing_doctors = await run_in_db_thread(find_consultation_references, batch)
+        row_numbers = []
+        consultation_documents = []
+        # randurile repetate in acelasi lot, pe care cautarea din is_duplicate_consultation nu le gaseste
+        batch_keys = set()
+
+        for row_number, consultation in batch:
+            row_errors = []
+            key = (consultation.id_patient, consultation.id_doctor, consultation.date, consultation.diagnostic)
+
+            if str(consultation.id_patient) not in existing_patients:
+                row_errors.append("Invalid patient ID")
+            if consultation.id_doctor not in existing_doctors:
+                row_errors.append("Invalid doctor ID")
+
+            if row_errors:
+                errors.append(create_row_error(row_number, status.HTTP_404_NOT_FOUND, row_errors))
+            elif key in batch_keys or await is_duplicate_consultation(*key):
+                errors.append(create_row_error(row_number, status.HTTP_409_CONFLICT,
+                                               ["A consultation with these parameters already exists"]))
+            else:
+                batch_keys.add(key)
+                row_numbers.append(row_number)
+                consultation_documents.append(build_consultation_document(
+                    consultation.id_patient, consultation.id_doctor, consultation.date, consultation.diagnostic,
+                    consultation.investigations))
+
+        if not consultation_documents:
+            continue
+
+        # insert_many(ordered=False) insereaza toate documentele valide; indexul fiecarei erori indica randul respins
+        write_errors = await consultation_repository.add_consultation_documents(consultation_documents)
+
+        for write_error in write_errors:
+            if write_error.get("code") == DUPLICATE_KEY_ERROR_CODE:
+                errors.append(create_row_error(row_numbers[write_error["index"]], status.HTTP_409_CONFLICT,
+                                               ["A consultation with these parameters already exists"]))
+            else:
+                errors.append(create_row_error(row_numbers[write_error["index"]], status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                               [write_error.get("errmsg", "The consultation could not be saved")]))
+
+        created += len(consultation_documents) - len(write_errors)
+
+    response.status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+
+    return render_json(response, create_import_report(row_count, created, errors))
+
+
 @router.get("/api/medicineProject/consultations/{patient_id}/{doctor_id}/date/diagnostic")
 async def get_consultation(patient_id: int, doctor_id: int, date: str, diagnostic: str, response: Response):
-    patient = Patients.get_or_none(id=patient_id)
-    doctor = Doctors.get_or_none(id=doctor_id)
+    patient = await patient_cache.get(patient_id)
+    doctor = await doctor_cache.get_by_id(doctor_id)
 
     if patient is None:
         raise HTTPException(
@@ -124,7 +264,8 @@ async def get_consultation(patient_id: int, doctor_id: int, date: str, diagnosti
             detail="Invalid doctor ID",
         )
     else:
-        consultation = get_consultation_from_database(patient_id, doctor_id, date, diagnostic)
+        consultation = await consultation_repository.get_consultation_from_database(patient_id, doctor_id, date,
+                                                                                    diagnostic)
 
         if not consultation:
             raise HTTPException(
@@ -140,8 +281,15 @@ async def get_consultation(patient_id: int, doctor_id: int, date: str, diagnosti
 
 
 @router.get("/api/medicineProject/consultations/{patient_cnp}")
-async def get_consultations_by_patient_id(patient_cnp: int, response: Response):
-    patient = Patients.get_or_none(cnp=patient_cnp)
+async def get_consultations_by_patient_id(
+        patient_cnp: int,
+        request: Request,
+        response: Response,
+        limit: int = Query(CONSULTATION_PAGE_SIZE, ge=1, le=CONSULTATION_MAX_PAGE_SIZE, title="Limit",
+                           description="Maximum number of consultations returned."),
+        after: str = Query(None, title="After", description="Cursor taken from the next link of the previous page."),
+):
+    patient = await patient_cache.get(patient_cnp)
 
     if patient is None:
         response.status_code = status.HTTP_404_NOT_FOUND
@@ -149,7 +297,7 @@ async def get_consultations_by_patient_id(patient_cnp: int, response: Response):
             "message": "Invalid patient CNP",
         }
     else:
-        consultations = get_consultations_by_attribute(patient_cnp, "patient_id")
+        consultations, next_cursor = await get_consultations_page(patient_cnp, "patient_id", limit, after)
 
         if not consultations:
             raise HTTPException(
@@ -159,14 +307,21 @@ async def get_consultations_by_patient_id(patient_cnp: int, response: Response):
         else:
             response.status_code = status.HTTP_200_OK
 
-            response_data = create_response_data(consultations)
+            response_data = add_next_page_link(create_response_data(consultations), request, next_cursor)
 
-    return response_data
+    return render_json(response, response_data)
 
 
 @router.get("/api/medicineProject/consultations/{doctor_id}")
-async def get_consultations_by_doctor_id(doctor_id: int, response: Response):
-    doctor = Doctors.get_or_none(id=doctor_id)
+async def get_consultations_by_doctor_id(
+        doctor_id: int,
+        request: Request,
+        response: Response,
+        limit: int = Query(CONSULTATION_PAGE_SIZE, ge=1, le=CONSULTATION_MAX_PAGE_SIZE, title="Limit",
+                           description="Maximum number of consultations returned."),
+        after: str = Query(None, title="After", description="Cursor taken from the next link of the previous page."),
+):
+    doctor = await doctor_cache.get_by_id(doctor_id)
 
     if doctor is None:
         response.status_code = status.HTTP_404_NOT_FOUND
@@ -175,7 +330,7 @@ async def get_consultations_by_doctor_id(doctor_id: int, response: Response):
             detail="Invalid doctor ID",
         )
     else:
-        consultations = get_consultations_by_attribute(doctor_id, "doctor_id")
+        consultations, next_cursor = await get_consultations_page(doctor_id, "doctor_id", limit, after)
 
         if not consultations:
             raise HTTPException(
@@ -185,14 +340,21 @@ async def get_consultations_by_doctor_id(doctor_id: int, response: Response):
         else:
             response.status_code = status.HTTP_200_OK
 
-            response_data = create_response_data(consultations)
+            response_data = add_next_page_link(create_response_data(consultations), request, next_cursor)
 
-    return response_data
+    return render_json(response, response_data)
 
 
 @router.get("/api/medicineProject/consultations/date/")
-async def get_consultations_by_date(date: str, response: Response):
-    consultations = get_consultations_by_attribute(date, "date")
+async def get_consultations_by_date(
+        date: str,
+        request: Request,
+        response: Response,
+        limit: int = Query(CONSULTATION_PAGE_SIZE, ge=1, le=CONSULTATION_MAX_PAGE_SIZE, title="Limit",
+                           description="Maximum number of consultations returned."),
+        after: str = Query(None, title="After", description="Cursor taken from the next link of the previous page."),
+):
+    consultations, next_cursor = await get_consultations_page(date, "date", limit, after)
 
     if not consultations:
         raise HTTPException(
@@ -202,14 +364,21 @@ async def get_consultations_by_date(date: str, response: Response):
     else:
         response.status_code = status.HTTP_200_OK
 
-        response_data = create_response_data(consultations)
+        response_data = add_next_page_link(create_response_data(consultations), request, next_cursor)
 
-        return response_data
+        return render_json(response, response_data)
 
 
 @router.get("/api/medicineProject/consultations/diagnostics/")
-async def get_consultations_by_diagnostic(diagnostic: str, response: Response):
-    consultations = get_consultations_by_attribute(diagnostic, "diagnostic")
+async def get_consultations_by_diagnostic(
+        diagnostic: str,
+        request: Request,
+        response: Response,
+        limit: int = Query(CONSULTATION_PAGE_SIZE, ge=1, le=CONSULTATION_MAX_PAGE_SIZE, title="Limit",
+                           description="Maximum number of consultations returned."),
+        after: str = Query(None, title="After", description="Cursor taken from the next link of the previous page."),
+):
+    consultations, next_cursor = await get_consultations_page(diagnostic, "diagnostic", limit, after)
 
     if not consultations:
         raise HTTPException(
@@ -219,14 +388,20 @@ async def get_consultations_by_diagnostic(diagnostic: str, response: Response):
     else:
         response.status_code = status.HTTP_200_OK
 
-        response_data = create_response_data(consultations)
+        response_data = add_next_page_link(create_response_data(consultations), request, next_cursor)
 
-        return response_data
+        return render_json(response, response_data)
 
 
 @router.get("/api/medicineProject/consultations/")
-async def get_all_consultations(response: Response):
-    consultations = get_consultations_by_attribute("", "")
+async def get_all_consultations(
+        request: Request,
+        response: Response,
+        limit: int = Query(CONSULTATION_PAGE_SIZE, ge=1, le=CONSULTATION_MAX_PAGE_SIZE, title="Limit",
+                           description="Maximum number of consultations returned."),
+        after: str = Query(None, title="After", description="Cursor taken from the next link of the previous page."),
+):
+    consultations, next_cursor = await get_consultations_page("", "", limit, after)
 
     if len(consultations) == 0:
         raise HTTPException(
@@ -236,9 +411,26 @@ async def get_all_consultations(response: Response):
     else:
         response.status_code = status.HTTP_200_OK
 
-        response_data = create_response_data(consultations)
+        response_data = add_next_page_link(create_response_data(consultations), request, next_cursor)
 
-        return response_data
+        return render_json(response, response_data)
+
+
+@router.get("/api/medicineProject/consultations/export/")
+async def export_consultations(
+        patient_id: int = Query(None, title="Patient ID", description="Export only the consultations of this patient."),
+        doctor_id: int = Query(None, title="Doctor ID", description="Export only the consultations of this doctor."),
+        date: str = Query(None, title="Date", description="Export only the consultations from this date."),
+        diagnostic: str = Query(None, title="Diagnostic", description="Export only this diagnostic."),
+        compress: bool = Query(False, title="Compress", description="Compress the export with gzip."),
+):
+    # consultatiile sunt citite din cursor si scrise in raspuns lot cu lot, deci memoria folosita nu depinde de
+    # dimensiunea colectiei
+    consultation_filter = build_consultation_export_filter(patient_id, doctor_id, date, diagnostic)
+    batches = consultation_repository.iter_consultation_batches(consultation_filter, CONSULTATION_EXPORT_BATCH_SIZE)
+
+    return export_response(ndjson_stream(batches, build_consultation_export_row), "application/x-ndjson",
+                           "consultations.ndjson", compress)
 
 
 @router.put("/api/medicineProject/consultations/")
@@ -248,18 +440,18 @@ async def update_consultation(
         response: Response,
 ):
     if is_valid_consultation(new_consultation) and is_valid_consultation(existing_consultation):
-        patient = Patients.get_or_none(cnp=existing_consultation.id_patient)
-        doctor = Doctors.get_or_none(id=existing_consultation.id_doctor)
-        new_patient = Patients.get_or_none(cnp=existing_consultation.id_patient)
-        new_doctor = Doctors.get_or_none(id=existing_consultation.id_doctor)
+        # consultatia existenta este cautata mai jos dupa toate cele 4 campuri, deci sunt verificate doar pacientul si
+        # doctorul la care va trimite consultatia modificata
+        new_patient = await patient_cache.get(new_consultation.id_patient)
+        new_doctor = await doctor_cache.get_by_id(new_consultation.id_doctor)
 
-        if patient is None and new_patient is None:
+        if new_patient is None:
             response.status_code = status.HTTP_404_NOT_FOUND
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Invalid patient CNP",
             )
-        elif doctor is None and new_doctor is None:
+        elif new_doctor is None:
             response.status_code = status.HTTP_404_NOT_FOUND
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -276,19 +468,30 @@ async def update_consultation(
                     detail="To update a consultation you must modify at least a parameter!",
                 )
             else:
-                existing_consultation = get_consultation_from_database(existing_consultation.id_patient,
-                                                                       existing_consultation.id_doctor,
-                                                                       existing_consultation.date,
-                                                                       existing_consultation.diagnostic)
+                existing_consultation = await consultation_repository.get_consultation_from_database(
+                    existing_consultation.id_patient, existing_consultation.id_doctor, existing_consultation.date,
+                    existing_consultation.diagnostic)
                 if len(existing_consultation) == 0:
                     raise HTTPException(
                         status_code=status.HTTP_404_NOT_FOUND,
                         detail="The consultation with the given details could not been found!",
                     )
+                elif await is_duplicate_consultation(new_consultation.id_patient, new_consultation.id_doctor,
+                                                     new_consultation.date, new_consultation.diagnostic):
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="A consultation with these parameters already exits!",
+                    )
                 else:
-                    update_consultation_in_database(existing_consultation[0]['_id'], new_consultation.id_patient,
-                                                    new_consultation.id_doctor,
-                                                    new_consultation.date, new_consultation.diagnostic)
+                    try:
+                        await consultation_repository.update_consultation_in_database(
+                            existing_consultation[0]['_id'], new_consultation.id_patient, new_consultation.id_doctor,
+                            new_consultation.date, new_consultation.diagnostic)
+                    except DuplicateKeyError:
+                        raise HTTPException(
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail="A consultation with these parameters already exits!",
+                        )
 
                     response.status_code = status.HTTP_204_NO_CONTENT
                     return JSONResponse(content=None, status_code=status.HTTP_204_NO_CONTENT)
@@ -314,8 +517,8 @@ async def delete_consultation(
         consultation: ConsultationDTO,
         response: Response):
     if is_valid_consultation(consultation):
-        patient = Patients.get_or_none(cnp=consultation.id_patient)
-        doctor = Doctors.get_or_none(id=consultation.id_doctor)
+        patient = await patient_cache.get(consultation.id_patient)
+        doctor = await doctor_cache.get_by_id(consultation.id_doctor)
 
         if patient is None:
             response.status_code = status.HTTP_404_NOT_FOUND
@@ -330,15 +533,15 @@ async def delete_consultation(
                 detail="Invalid doctor ID",
             )
         else:
-            consultation = get_consultation_from_database(consultation.id_patient, consultation.id_doctor,
-                                                          consultation.date, consultation.diagnostic)
+            consultation = await consultation_repository.get_consultation_from_database(
+                consultation.id_patient, consultation.id_doctor, consultation.date, consultation.diagnostic)
             if len(consultation) == 0:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="The consultation with the given details could not been found!",
                 )
             else:
-                delete_consultation_from_database(consultation[0]['_id'])
+                await consultation_repository.delete_consultation_from_database(consultation[0]['_id'])
 
                 response.status_code = status.HTTP_204_NO_CONTENT
                 return JSONResponse(content=None, status_code=status.HTTP_204_NO_CONTENT)
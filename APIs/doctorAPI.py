@@ -1,13 +1,29 @@
-from fastapi import APIRouter, Response, HTTPException, status, Query
+from fastapi import APIRouter, Request, Response, HTTPException, status, Query
+from peewee import IntegrityError
 from starlette.responses import JSONResponse
 
 from DTO.validationDTO import *
 from Databases.SQL.SQLDatabase import Doctors
+from Databases.SQL.doctorCache import doctor_cache
+from Databases.dataAccess import run_in_db_thread
 from DTO.doctorDTO import *
+from Utils.etag import conditional_json
+from Utils.jsonResponse import render_json
+from Utils.links import LinkTemplate
 
 router = APIRouter()
 
 
+DOCTOR_LINKS = LinkTemplate("/api/medicineProject/doctors", [
+    ("self", "", "GET"),
+    ("update_name", "/name", "PUT"),
+    ("update_email", "/email", "PUT"),
+    ("update_phone_number", "/phone_number", "PUT"),
+    ("update_speciality", "/speciality", "PUT"),
+    ("delete doctor", "", "DELETE"),
+])
+
+
 def create_response_data(doctor: DoctorDTO):
     response_data = {
         "doctor": {
@@ -17,20 +33,7 @@ def create_response_data(doctor: DoctorDTO):
             "email": doctor.email,
             "phone_number": doctor.phone_number,
             "speciality": doctor.speciality,
-            "links": {
-                "self": {
-                    "href": f"/api/medicineProject/doctors/{doctor.id}", "type": "GET"
-                },
-                "update_name": {"href": f"/api/medicineProject/doctors/{doctor.id}/name", "type": "PUT"},
-                "update_email": {"href": f"/api/medicineProject/doctors/{doctor.id}/email", "type": "PUT"},
-                "update_phone_number": {"href": f"/api/medicineProject/doctors/{doctor.id}/phone_number",
-                                        "type": "PUT"},
-                "update_speciality": {"href": f"/api/medicineProject/doctors/{doctor.id}/speciality",
-                                      "type": "PUT"},
-                "delete doctor": {
-                    "href": f"/api/medicineProject/doctors/{doctor.id}", "type": "DELETE"
-                }
-            }
+            "links": DOCTOR_LINKS.render(doctor.id)
         },
     }
 
@@ -42,21 +45,22 @@ async def create_doctor(
         doctor: DoctorDTO,
         response: Response,
 ):
-    existing_doctor_email = Doctors.get_or_none(email=doctor.email)
-    existing_doctor_phone = Doctors.get_or_none(phone_number=doctor.phone_number)
-
-    if existing_doctor_email or existing_doctor_phone:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                            detail="A doctor with this information already exists")
-
     if is_valid_doctor(doctor):
-        new_doctor = Doctors.create(
-            last_name=doctor.last_name,
-            first_name=doctor.first_name,
-            email=doctor.email,
-            phone_number=doctor.phone_number,
-            speciality=doctor.speciality
-        )
+        # email-ul si numarul de telefon sunt unice, duplicatele sunt respinse de indecsii unici
+        try:
+            new_doctor = await run_in_db_thread(
+                Doctors.create,
+                last_name=doctor.last_name,
+                first_name=doctor.first_name,
+                email=doctor.email,
+                phone_number=doctor.phone_number,
+                speciality=doctor.speciality
+            )
+        except IntegrityError:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="A doctor with this information already exists")
+
+        doctor_cache.invalidate(new_doctor.id)
 
         response.status_code = status.HTTP_201_CREATED
         response_data = create_response_data(new_doctor)
@@ -75,15 +79,18 @@ async def create_doctor(
 
 
 @router.get("/api/medicineProject/doctors/{doctor_id}")
-async def get_doctor_by_id(doctor_id: int, response: Response):
+async def get_doctor_by_id(doctor_id: int, request: Request, response: Response):
     try:
-        doctor = Doctors.get_by_id(doctor_id)
+        doctor = await doctor_cache.get_by_id(doctor_id)
+
+        if doctor is None:
+            raise Doctors.DoesNotExist
 
         response.status_code = status.HTTP_200_OK
 
         response_data = create_response_data(doctor)
 
-        return response_data
+        return conditional_json(request, response, response_data)
     except Doctors.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -108,7 +115,8 @@ async def get_doctors(
                     detail="Validation error in input data",
                 )
 
-            doctors = Doctors.filter((Doctors.last_name == last_name) & (Doctors.first_name == first_name))
+            doctors = await run_in_db_thread(list, Doctors.filter((Doctors.last_name == last_name) &
+                                                                  (Doctors.first_name == first_name)))
 
         elif speciality:
             if not is_valid_speciality(speciality):
@@ -117,7 +125,7 @@ async def get_doctors(
                     detail="Validation error in input data",
                 )
 
-            doctors = Doctors.filter(Doctors.speciality == speciality)
+            doctors = await doctor_cache.get_by_speciality(speciality)
 
         elif email:
             if not is_valid_email(email):
@@ -126,7 +134,7 @@ async def get_doctors(
                     detail="Validation error in input data",
                 )
 
-            doctor = Doctors.get_by_email(email)
+            doctor = await doctor_cache.get_by_email(email)
             response_data = create_response_data(doctor)
             return [response_data] if response_data else []
 
@@ -137,7 +145,7 @@ async def get_doctors(
                     detail="Validation error in input data",
                 )
 
-            doctor = Doctors.get_by_phone_number(phone_number)
+            doctor = await run_in_db_thread(Doctors.get_by_phone_number, phone_number)
             response_data = create_response_data(doctor)
             return [response_data] if response_data else []
 
@@ -155,7 +163,7 @@ async def get_doctors(
 
         response.status_code = status.HTTP_200_OK
         response_data = [create_response_data(doctor) for doctor in doctors]
-        return response_data
+        return render_json(response, response_data)
 
     except Doctors.DoesNotExist:
         raise HTTPException(
@@ -175,12 +183,13 @@ async def update_doctor_name(
     # acelasi nume
     try:
         if is_valid_name(updated_lastName) and is_valid_name(updated_firstName):
-            doctor = Doctors.get_by_id(doctor_id)
+            doctor = await run_in_db_thread(Doctors.get_by_id, doctor_id)
 
             doctor.last_name = updated_lastName
             doctor.first_name = updated_firstName
 
-            doctor.save()
+            await run_in_db_thread(doctor.save)
+            doctor_cache.invalidate(doctor.id)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -205,21 +214,20 @@ async def update_doctor_email(
 ):
     try:
         if is_valid_email(updated_email):
-            doctor = Doctors.get_by_email(email)
-            print(doctor)
-            # am presupus ca nu pot fi mai multi doctori cu aceeasi adresa de email
-            conflicting_email_doctor = Doctors.get_or_none(email=updated_email)
+            doctor = await run_in_db_thread(Doctors.get_by_email, email)
+            doctor.email = updated_email
 
-            if conflicting_email_doctor:
+            # nu pot fi mai multi doctori cu aceeasi adresa de email (index unic)
+            try:
+                await run_in_db_thread(doctor.save)
+            except IntegrityError:
                 raise HTTPException(status_code=status.HTTP_200_OK,
                                     detail="Another doctor already has this email")
-            else:
-                doctor.email = updated_email
 
-                doctor.save()
+            doctor_cache.invalidate(doctor.id)
 
-                response.status_code = status.HTTP_204_NO_CONTENT
-                return None
+            response.status_code = status.HTTP_204_NO_CONTENT
+            return None
         else:
             return JSONResponse(content="Validation error in input data",
                                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
@@ -239,18 +247,17 @@ async def update_doctor_phone_number(
 ):
     try:
         if is_valid_phone_number(updated_phone_number):
-            doctor = Doctors.get_by_id(doctor_id)
-
-            # am presupus ca nu pot fi mai multi doctori cu acelasi numar de telefon
-            conflicting_phone_doctor = Doctors.get_or_none(phoneNumber=updated_phone_number)
+            doctor = await run_in_db_thread(Doctors.get_by_id, doctor_id)
+            doctor.phone_number = updated_phone_number
 
-            if conflicting_phone_doctor and conflicting_phone_doctor.id != doctor_id:
+            # nu pot fi mai multi doctori cu acelasi numar de telefon (index unic)
+            try:
+                await run_in_db_thread(doctor.save)
+            except IntegrityError:
                 raise HTTPException(status_code=status.HTTP_200_OK,
                                     detail="Another doctor already has this phone number")
 
-            doctor.phone_number = updated_phone_number
-
-            doctor.save()
+            doctor_cache.invalidate(doctor.id)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -273,11 +280,12 @@ async def update_doctor_speciality(
 ):
     try:
         if is_valid_speciality(updated_speciality):
-            doctor = Doctors.get_by_id(doctor_id)
+            doctor = await run_in_db_thread(Doctors.get_by_id, doctor_id)
 
             doctor.speciality = updated_speciality
 
-            doctor.save()
+            await run_in_db_thread(doctor.save)
+            doctor_cache.invalidate(doctor.id)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -295,9 +303,10 @@ async def update_doctor_speciality(
 @router.delete("/api/medicineProject/doctors/{doctor_id}")
 async def delete_doctor(doctor_id: int, response: Response):
     try:
-        doctor = Doctors.get_by_id(doctor_id)
+        doctor = await run_in_db_thread(Doctors.get_by_id, doctor_id)
 
-        doctor.delete_instance()
+        await run_in_db_thread(doctor.delete_instance)
+        doctor_cache.invalidate(doctor_id)
 
         response.status_code = status.HTTP_204_NO_CONTENT
 
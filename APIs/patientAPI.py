@@ -1,12 +1,44 @@
-from fastapi import APIRouter, Response, HTTPException, status, Query
+from fastapi import APIRouter, Request, Response, HTTPException, status, Query
+from peewee import IntegrityError
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
+from config import PATIENT_EXPORT_CHUNK_SIZE, PATIENT_IMPORT_BATCH_SIZE
 from DTO.validationDTO import *
-from Databases.SQL.SQLDatabase import Patients
+from Databases.SQL.SQLDatabase import Patients, db
+from Databases.SQL.patientCache import patient_cache
+from Databases.dataAccess import run_in_db_thread
 from DTO.patientDTO import *
+from Utils.bulkImport import parse_import_body, format_validation_errors, create_row_error, chunked, \
+    create_import_report
+from Utils.etag import conditional_json
+from Utils.exportStreams import ndjson_stream, csv_stream, export_response
+from Utils.jsonResponse import render_json
+from Utils.links import LinkTemplate
 
 router = APIRouter()
 
 
+PATIENT_LINKS = LinkTemplate("/api/medicineProject/patients", [
+    ("self", "", "GET"),
+    ("update_cnp", "/cnp", "PUT"),
+    ("update_name", "/name", "PUT"),
+    ("update_email", "/email", "PUT"),
+    ("update_phone_number", "/phone_number", "PUT"),
+    ("update_age_and_birthday", "/age_and_birthday", "PUT"),
+    ("update_phone_is_active", "/is_active", "PUT"),
+    ("delete patient", "", "DELETE"),
+])
+
+
+PATIENT_EXPORT_FIELDS = (Patients.cnp, Patients.lastName, Patients.firstName, Patients.email, Patients.phoneNumber,
+                         Patients.age, Patients.birthday, Patients.is_active)
+PATIENT_EXPORT_COLUMNS = tuple(field.name for field in PATIENT_EXPORT_FIELDS)
+
+# cnp-ul, email-ul si numarul de telefon nu pot fi aceleasi la mai multi pacienti
+PATIENT_UNIQUE_FIELDS = (Patients.cnp, Patients.email, Patients.phoneNumber)
+
+
 def create_response_data(patient: PatientDTO):
     response_data = {
         "patient": {
@@ -18,25 +50,7 @@ def create_response_data(patient: PatientDTO):
             "age": patient.age,
             "birthday": patient.birthday,
             "is_active": patient.is_active,
-            "links": {
-                "self": {
-                    "href": f"/api/medicineProject/patients/{patient.cnp}", "type": "GET"
-                },
-                "update_cnp": {"href": f"/api/medicineProject/patients/{patient.cnp}/cnp", "type": "PUT"},
-                "update_name": {"href": f"/api/medicineProject/patients/{patient.cnp}/name", "type": "PUT"},
-                "update_email": {"href": f"/api/medicineProject/patients/{patient.cnp}/email",
-                                 "type": "PUT"},
-                "update_phone_number": {"href": f"/api/medicineProject/patients/{patient.cnp}/phone_number",
-                                        "type": "PUT"},
-                "update_age_and_birthday": {
-                    "href": f"/api/medicineProject/patients/{patient.cnp}/age_and_birthday",
-                    "type": "PUT"},
-                "update_phone_is_active": {"href": f"/api/medicineProject/patients/{patient.cnp}/is_active",
-                                           "type": "PUT"},
-                "delete patient": {
-                    "href": f"/api/medicineProject/patients/{patient.cnp}", "type": "DELETE"
-                }
-            }
+            "links": PATIENT_LINKS.render(patient.cnp)
         },
     }
 
@@ -48,25 +62,27 @@ async def create_patient(
         patient: PatientDTO,
         response: Response,
 ):
-    existing_patient_cnp = Patients.get_or_none(cnp=patient.cnp)
-    existing_patient_email = Patients.get_or_none(email=patient.email)
-    existing_patient_phone = Patients.get_or_none(phoneNumber=patient.phoneNumber)
-    # cnp-ul, email-ul si numarul de telefon nu poate fi acelasi la mai multi pacienti
-    if existing_patient_cnp or existing_patient_email or existing_patient_phone:
-        raise HTTPException(status_code=status.HTTP_200_OK,
-                            detail="A patient with this information already exists")
-
     if is_valid_patient(patient):
-        new_patient = Patients.create(
-            cnp=patient.cnp,
-            lastName=patient.lastName,
-            firstName=patient.firstName,
-            email=patient.email,
-            phoneNumber=patient.phoneNumber,
-            age=patient.age,
-            birthday=patient.birthday,
-            is_active=True
-        )
+        # cnp-ul, email-ul si numarul de telefon nu pot fi aceleasi la mai multi pacienti; duplicatele sunt respinse de
+        # cheia primara si de indecsii unici
+        try:
+            new_patient = await run_in_db_thread(
+                Patients.create,
+                cnp=patient.cnp,
+                lastName=patient.lastName,
+                firstName=patient.firstName,
+                email=patient.email,
+                phoneNumber=patient.phoneNumber,
+                age=patient.age,
+                birthday=patient.birthday,
+                is_active=True
+            )
+        except IntegrityError:
+            raise HTTPException(status_code=status.HTTP_200_OK,
+                                detail="A patient with this information already exists")
+
+        # CNP-ul poate fi memorat ca inexistent in cache
+        patient_cache.invalidate(patient.cnp)
 
         response.status_code = status.HTTP_201_CREATED
 
@@ -84,16 +100,126 @@ async def create_patient(
     return response_data
 
 
+def validate_import_rows(body, content_type):
+    rows = parse_import_body(body, content_type)
+    seen_values = {field.name: set() for field in PATIENT_UNIQUE_FIELDS}
+    valid_rows = []
+    errors = []
+
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            patient = PatientDTO.model_validate(row)
+        except ValidationError as error:
+            errors.append(create_row_error(row_number, status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                           format_validation_errors(error)))
+            continue
+
+        if not is_valid_patient(patient):
+            errors.append(create_row_error(row_number, status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                           ["Validation error in input data"]))
+            continue
+
+        duplicated_fields = [name for name, values in seen_values.items() if getattr(patient, name) in values]
+
+        if duplicated_fields:
+            errors.append(create_row_error(row_number, status.HTTP_409_CONFLICT,
+                                           [f"Duplicate {name} in the uploaded data" for name in duplicated_fields]))
+            continue
+
+        for name, values in seen_values.items():
+            values.add(getattr(patient, name))
+
+        valid_rows.append((row_number, patient.model_dump()))
+
+    return len(rows), valid_rows, errors
+
+
+def insert_patient_batch(batch):
+    # pacientii existenti sunt gasiti cu cate o interogare IN pentru fiecare camp unic, pentru tot lotul
+    existing_values = {
+        field.name: Patients.find_existing(field, {patient[field.name] for _, patient in batch})
+        for field in PATIENT_UNIQUE_FIELDS
+    }
+    new_patients = []
+    errors = []
+
+    for row_number, patient in batch:
+        duplicated_fields = [name for name, values in existing_values.items() if patient[name] in values]
+
+        if duplicated_fields:
+            errors.append(create_row_error(row_number, status.HTTP_409_CONFLICT,
+                                           [f"A patient with this {name} already exists"
+                                            for name in duplicated_fields]))
+        else:
+            new_patients.append((row_number, patient))
+
+    if not new_patients:
+        return 0, errors
+
+    try:
+        with db.atomic():
+            Patients.insert_many([patient for _, patient in new_patients]).execute()
+
+        return len(new_patients), errors
+
+    except IntegrityError:
+        # un pacient a fost adaugat intre verificare si INSERT; lotul este reluat rand cu rand pentru a-l gasi
+        imported = 0
+
+        for row_number, patient in new_patients:
+            try:
+                with db.atomic():
+                    Patients.insert(patient).execute()
+                imported += 1
+            except IntegrityError:
+                errors.append(create_row_error(row_number, status.HTTP_409_CONFLICT,
+                                               ["A patient with this information already exists"]))
+
+        return imported, errors
+
+
+@router.post("/api/medicineProject/patients/import/")
+async def import_patients(request: Request, response: Response):
+    # parsarea si validarea pot dura pentru fisiere mari, deci nu se fac pe event loop
+    try:
+        row_count, valid_rows, errors = await run_in_threadpool(validate_import_rows, await request.body(),
+                                                                request.headers.get("content-type", ""))
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(error),
+        )
+
+    imported = 0
+
+    for batch in chunked(valid_rows, PATIENT_IMPORT_BATCH_SIZE):
+        batch_imported, batch_errors = await run_in_db_thread(insert_patient_batch, batch)
+
+        for _, patient in batch:
+            patient_cache.invalidate(patient["cnp"])
+
+        imported += batch_imported
+        errors.extend(batch_errors)
+
+    response.status_code = status.HTTP_201_CREATED if imported else status.HTTP_200_OK
+
+    return render_json(response, create_import_report(row_count, imported, errors))
+
+
 @router.get("/api/medicineProject/patients/{patient_cnp}")
-async def get_patient(patient_cnp: str, response: Response):
+async def get_patient(patient_cnp: str, request: Request, response: Response):
     try:
-        patient = Patients.get_by_cnp(patient_cnp)
+        # pacientul vine din cache, deci si un raspuns 304 se obtine de obicei fara interogarea bazei de date
+        patient = await patient_cache.get(patient_cnp)
+
+        if patient is None:
+            raise Patients.DoesNotExist
 
         response.status_code = status.HTTP_200_OK
 
         response_data = create_response_data(patient)
 
-        return response_data
+        return conditional_json(request, response, response_data)
 
     except Patients.DoesNotExist:
         raise HTTPException(
@@ -154,7 +280,9 @@ async def get_patients(
                 detail="At least the last_name and first_name, or CNP, or email, or phone number should be provided.",
             )
 
-        if patients.count() == 0:
+        patients = await run_in_db_thread(list, patients)
+
+        if len(patients) == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No patients found with the given criteria.",
@@ -165,7 +293,7 @@ async def get_patients(
             patients_data = [create_response_data(patient) for patient in patients]
             response_data = {"patients": patients_data}
 
-            return response_data
+            return render_json(response, response_data)
 
     except Patients.DoesNotExist:
         raise HTTPException(
@@ -174,6 +302,42 @@ async def get_patients(
         )
 
 
+async def iter_patient_chunks(chunk_size):
+    after_cnp = None
+
+    while True:
+        patients = await run_in_db_thread(Patients.export_chunk, PATIENT_EXPORT_FIELDS, after_cnp, chunk_size)
+
+        if not patients:
+            break
+
+        yield patients
+
+        if len(patients) < chunk_size:
+            break
+
+        after_cnp = patients[-1][0]
+
+
+def create_export_row(patient):
+    return dict(zip(PATIENT_EXPORT_COLUMNS, patient))
+
+
+@router.get("/api/medicineProject/patients/export/")
+async def export_patients(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$", title="Format",
+                               description="Format of the export: csv or ndjson."),
+    compress: bool = Query(False, title="Compress", description="Compress the export with gzip."),
+):
+    # pacientii sunt cititi in bucati de PATIENT_EXPORT_CHUNK_SIZE randuri si scrisi imediat in raspuns
+    chunks = iter_patient_chunks(PATIENT_EXPORT_CHUNK_SIZE)
+
+    if export_format == "csv":
+        return export_response(csv_stream(PATIENT_EXPORT_COLUMNS, chunks), "text/csv", "patients.csv", compress)
+
+    return export_response(ndjson_stream(chunks, create_export_row), "application/x-ndjson", "patients.ndjson",
+                           compress)
+
 
 @router.put("/api/medicineProject/patients/{patient_cnp}/name")
 async def update_patient_name(
@@ -184,12 +348,13 @@ async def update_patient_name(
 ):
     try:
         if is_valid_name(updated_lastName) and is_valid_name(updated_firstName):
-            patient = Patients.get_by_cnp(patient_cnp)
+            patient = await run_in_db_thread(Patients.get_by_cnp, patient_cnp)
 
             patient.lastName = updated_lastName
             patient.firstName = updated_firstName
 
-            patient.save()
+            await run_in_db_thread(patient.save)
+            patient_cache.invalidate(patient_cnp)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -208,20 +373,19 @@ async def update_patient_email(
         response: Response,
 ):
     try:
-        patient = Patients.get_by_cnp(patient_cnp)
-        conflicting_email_patient = Patients.get_by_email(updated_email)
-        if conflicting_email_patient:
-            raise HTTPException(status_code=status.HTTP_200_OK,
-                                detail="Another patient already has this email")
-        # nu pot fi mai multi pacienti cu acelasi email
+        patient = await run_in_db_thread(Patients.get_by_cnp, patient_cnp)
+
         if is_valid_email(updated_email):
-            print(patient.email)
-            print()
             patient.email = updated_email
 
-            patient.save()
-            print(patient.email)
-            print()
+            # nu pot fi mai multi pacienti cu acelasi email (index unic)
+            try:
+                await run_in_db_thread(patient.save)
+                patient_cache.invalidate(patient_cnp)
+            except IntegrityError:
+                raise HTTPException(status_code=status.HTTP_200_OK,
+                                    detail="Another patient already has this email")
+
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
         else:
@@ -239,18 +403,18 @@ async def update_patient_phone_number(
         response: Response,
 ):
     try:
-        patient = Patients.get_by_cnp(patient_cnp)
-
-        conflicting_phone_patient = Patients.get_by_phone_number(updated_phoneNumber)
-        # nu pot fi mai multi pacienti cu acelasi numar de telefon
-        if conflicting_phone_patient:
-            raise HTTPException(status_code=status.HTTP_200_OK,
-                                detail="Another patient already has this phone number")
+        patient = await run_in_db_thread(Patients.get_by_cnp, patient_cnp)
 
         if is_valid_phone_number(updated_phoneNumber):
-            patient.phone_number = updated_phoneNumber
+            patient.phoneNumber = updated_phoneNumber
 
-            patient.save()
+            # nu pot fi mai multi pacienti cu acelasi numar de telefon (index unic)
+            try:
+                await run_in_db_thread(patient.save)
+                patient_cache.invalidate(patient_cnp)
+            except IntegrityError:
+                raise HTTPException(status_code=status.HTTP_200_OK,
+                                    detail="Another patient already has this phone number")
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -270,13 +434,14 @@ async def update_patient_age_and_birthday(
         response: Response,
 ):
     try:
-        patient = Patients.get_by_cnp(patient_cnp)
+        patient = await run_in_db_thread(Patients.get_by_cnp, patient_cnp)
 
         if is_valid_age(updated_age) and is_valid_date(updated_birthday):
             patient.age = updated_age
             patient.birthday = updated_birthday
 
-            patient.save()
+            await run_in_db_thread(patient.save)
+            patient_cache.invalidate(patient_cnp)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -296,11 +461,12 @@ async def update_patient_is_active(
 ):
     try:
         if is_valid_is_active(updated_is_active):
-            patient = Patients.get_by_cnp(patient_cnp)
+            patient = await run_in_db_thread(Patients.get_by_cnp, patient_cnp)
 
             patient.is_active = updated_is_active
 
-            patient.save()
+            await run_in_db_thread(patient.save)
+            patient_cache.invalidate(patient_cnp)
 
             response.status_code = status.HTTP_204_NO_CONTENT
             return None
@@ -315,9 +481,10 @@ async def update_patient_is_active(
 @router.delete("/api/medicineProject/patients/{patient_id}")
 async def delete_patient(patient_cnp: str, response: Response):
     try:
-        patient = Patients.get_by_cnp(patient_cnp)
+        patient = await run_in_db_thread(Patients.get_by_cnp, patient_cnp)
 
-        patient.delete_instance()
+        await run_in_db_thread(patient.delete_instance)
+        patient_cache.invalidate(patient_cnp)
 
         response.status_code = status.HTTP_204_NO_CONTENT
 
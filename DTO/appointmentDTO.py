@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
@@ -6,3 +8,12 @@ class AppointmentDTO(BaseModel):
     id_doctor: int
     date: str
     status: str
+
+
+class AppointmentStatusUpdateDTO(BaseModel):
+    status: str
+    ids: Optional[List[int]] = None
+    doctor_id: Optional[int] = None
+    patient_cnp: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
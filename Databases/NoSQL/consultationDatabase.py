@@ -1,17 +1,97 @@
-from datetime import datetime
+import base64
+import logging
+from itertools import islice
 
-import pymongo
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
 
+from Databases.NoSQL.mongoClient import get_mongo_database
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+logger = logging.getLogger("medicineProject.consultations")
+
+# consultatiile sunt returnate ordonate dupa data (format "%Y-%m-%d", deci ordinea lexicografica este cea
+# cronologica), iar _id-ul departajeaza consultatiile din aceeasi zi si face paginarea stabila
+CONSULTATION_SORT = [("date", ASCENDING), ("_id", ASCENDING)]
+
+CONSULTATION_UNIQUE_INDEX = "patient_doctor_date_diagnostic_unique"
+
+# indecsii corespunzatori cautarilor din acest modul (filtru + sortare); indexul unic pe cele 4 campuri inlocuieste
+# verificarea existentei unei consultatii inainte de inserare
+CONSULTATION_INDEXES = [
+    IndexModel([("patient_id", ASCENDING)] + CONSULTATION_SORT, name="patient_id_date_id"),
+    IndexModel([("doctor_id", ASCENDING)] + CONSULTATION_SORT, name="doctor_id_date_id"),
+    IndexModel([("diagnostic", ASCENDING)] + CONSULTATION_SORT, name="diagnostic_date_id"),
+    IndexModel(CONSULTATION_SORT, name="date_id"),
+    IndexModel([("patient_id", ASCENDING), ("doctor_id", ASCENDING), ("date", ASCENDING), ("diagnostic", ASCENDING)],
+               name=CONSULTATION_UNIQUE_INDEX, unique=True),
+]
+
+# numarul de grupuri de consultatii care au aceleasi valori pentru campurile indexului unic
+DUPLICATE_CONSULTATIONS_PIPELINE = [
+    {"$group": {"_id": {"patient_id": "$patient_id", "doctor_id": "$doctor_id", "date": "$date",
+                        "diagnostic": "$diagnostic"},
+                "count": {"$sum": 1}}},
+    {"$match": {"count": {"$gt": 1}}},
+    {"$count": "groups"},
+]
+
+
+def get_consultation_collection():
+    return get_mongo_database()["consultatii"]
+
+
+def select_consultation_indexes(duplicate_groups):
+    # indexul unic nu poate fi creat cat timp exista duplicate, iar eroarea ar opri pornirea aplicatiei; ceilalti
+    # indecsi sunt creati, iar duplicatele trebuie sterse inainte de "python manage.py indexes create"; pana atunci
+    # API-ul cauta o consultatie identica inainte de fiecare scriere (vezi is_duplicate_consultation)
+    # $count nu intoarce niciun document cand nu exista duplicate
+    duplicate_group_count = duplicate_groups[0]["groups"] if duplicate_groups else 0
+
+    if not duplicate_group_count:
+        return CONSULTATION_INDEXES
+
+    logger.warning("Index %s was not created: %d groups of duplicate consultations exist",
+                   CONSULTATION_UNIQUE_INDEX, duplicate_group_count)
+
+    return [index for index in CONSULTATION_INDEXES if index.document["name"] != CONSULTATION_UNIQUE_INDEX]
 
-def add_consultation_document(patient_id, doctor_id, date, diagnostic, investigations):
-    client = pymongo.MongoClient("mongodb://localhost:27017/")
 
-    database = client["medicineProjectNoSQL"]
+def ensure_consultation_indexes():
+    collection = get_consultation_collection()
+    indexes = CONSULTATION_INDEXES
 
-    consultation_collection = database["consultatii"]
+    # agregarea parcurge toata colectia, deci duplicatele sunt cautate doar cat timp indexul unic lipseste;
+    # create_indexes nu modifica nimic daca indecsii exista deja cu aceeasi definitie
+    if CONSULTATION_UNIQUE_INDEX not in collection.index_information():
+        indexes = select_consultation_indexes(list(collection.aggregate(DUPLICATE_CONSULTATIONS_PIPELINE)))
 
-    consultation_document = {
+    return collection.create_indexes(indexes)
+
+
+def get_consultation_indexes():
+    return get_consultation_collection().index_information()
+
+
+def find_missing_consultation_indexes(existing_indexes):
+    missing_indexes = []
+
+    for index in CONSULTATION_INDEXES:
+        expected = index.document
+        existing = existing_indexes.get(expected["name"])
+
+        if (existing is None or list(existing["key"]) != list(expected["key"].items()) or
+                existing.get("unique", False) != expected.get("unique", False)):
+            missing_indexes.append(expected["name"])
+
+    return missing_indexes
+
+
+def build_consultation_document(patient_id, doctor_id, date, diagnostic, investigations):
+    return {
         "patient_id": patient_id,
         "doctor_id": doctor_id,
         "date": date,
@@ -19,38 +99,109 @@ def add_consultation_document(patient_id, doctor_id, date, diagnostic, investiga
         "investigations": investigations
     }
 
+
+def encode_consultation_cursor(consultation):
+    cursor = f"{consultation['date']}|{consultation['_id']}"
+
+    return base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii")
+
+
+def decode_consultation_cursor(cursor):
+    try:
+        date, consultation_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rsplit("|", 1)
+
+        return date, ObjectId(consultation_id)
+
+    except (ValueError, InvalidId):
+        raise ValueError(f"Invalid consultation cursor: {cursor}")
+
+
+def build_consultation_filter(searched, attribute, after=None):
+    consultation_filter = {}
+
+    if attribute in ["patient_id", "doctor_id", "diagnostic", "date"]:
+        consultation_filter[attribute] = searched
+
+    # paginare de tip keyset: doar consultatiile aflate dupa (date, _id) din cursor, in ordinea CONSULTATION_SORT
+    if after is not None:
+        after_date, after_id = after
+        consultation_filter["$or"] = [
+            {"date": {"$gt": after_date}},
+            {"date": after_date, "_id": {"$gt": after_id}},
+        ]
+
+    return consultation_filter
+
+
+def build_consultation_export_filter(patient_id=None, doctor_id=None, date=None, diagnostic=None):
+    filters = {"patient_id": patient_id, "doctor_id": doctor_id, "date": date, "diagnostic": diagnostic}
+
+    return {attribute: value for attribute, value in filters.items() if value is not None}
+
+
+def build_consultation_export_row(consultation):
+    return {
+        "id": str(consultation["_id"]),
+        "id_patient": consultation["patient_id"],
+        "id_doctor": consultation["doctor_id"],
+        "date": consultation["date"],
+        "diagnostic": consultation["diagnostic"],
+        "investigations": consultation.get("investigations"),
+    }
+
+
+def open_consultation_cursor(consultation_filter, batch_size):
+    # batch_size limiteaza cate documente aduce serverul intr-un raspuns getMore, deci si memoria folosita de cursor
+    return (get_consultation_collection().find(consultation_filter).sort(CONSULTATION_SORT)
+            .batch_size(batch_size))
+
+
+def fetch_consultation_batch(cursor, batch_size):
+    return list(islice(cursor, batch_size))
+
+
+def add_consultation_document(patient_id, doctor_id, date, diagnostic, investigations):
+    consultation_collection = get_consultation_collection()
+
+    consultation_document = build_consultation_document(patient_id, doctor_id, date, diagnostic, investigations)
+
+    # insert_one completeaza documentul cu _id-ul generat, deci nu mai este nevoie de o citire ulterioara;
+    # o consultatie duplicata este respinsa de indexul unic cu DuplicateKeyError
     consultation_collection.insert_one(consultation_document)
 
-    client.close()
+    return consultation_document
+
+
+def add_consultation_documents(consultation_documents):
+    consultation_collection = get_consultation_collection()
+
+    # ordered=False continua inserarea dupa un document respins; erorile sunt returnate cu indexul documentului
+    try:
+        consultation_collection.insert_many(consultation_documents, ordered=False)
+    except BulkWriteError as error:
+        return error.details.get("writeErrors", [])
+
+    return []
+
 
+def create_write_error(write_error):
+    if write_error.get("code") == DUPLICATE_KEY_ERROR_CODE:
+        return DuplicateKeyError(write_error.get("errmsg"), DUPLICATE_KEY_ERROR_CODE, write_error)
 
-def get_consultations_by_attribute(searched, attribute):
-    client = pymongo.MongoClient("mongodb://localhost:27017/")
-    database = client["medicineProjectNoSQL"]
-    consultation_collection = database["consultatii"]
+    return WriteError(write_error.get("errmsg"), write_error.get("code"), write_error)
 
-    consultations = []
 
-    if attribute == "":
-        consultations = list(consultation_collection.find({}))
-    if attribute == "patient_id":
-        consultations = list(consultation_collection.find({"patient_id": searched}))
-    if attribute == "doctor_id":
-        consultations = list(consultation_collection.find({"doctor_id": searched}))
-    if attribute == "diagnostic":
-        consultations = list(consultation_collection.find({"diagnostic": searched}))
-    if attribute == "date":
-        consultations = list(consultation_collection.find({"date": searched}))
+def get_consultations_by_attribute(searched, attribute, limit=0, after=None):
+    consultation_collection = get_consultation_collection()
 
-    consultations.sort(key=lambda x: datetime.strptime(x["date"], "%Y-%m-%d"))
+    consultations = list(consultation_collection.find(build_consultation_filter(searched, attribute, after))
+                         .sort(CONSULTATION_SORT).limit(limit))
 
     return consultations
 
 
 def get_consultation_from_database(patient_id, doctor_id, date, diagnostic):
-    client = pymongo.MongoClient("mongodb://localhost:27017/")
-    database = client["medicineProjectNoSQL"]
-    consultation_collection = database["consultatii"]
+    consultation_collection = get_consultation_collection()
 
     consultations = list(consultation_collection.find({"patient_id": patient_id, "doctor_id": doctor_id, "date": date,
                                                        "diagnostic": diagnostic}))
@@ -59,9 +210,7 @@ def get_consultation_from_database(patient_id, doctor_id, date, diagnostic):
 
 
 def update_consultation_in_database(consultation_id, new_patient_id, new_doctor_id, new_date, new_diagnostic):
-    client = pymongo.MongoClient("mongodb://localhost:27017/")
-    database = client["medicineProjectNoSQL"]
-    consultation_collection = database["consultatii"]
+    consultation_collection = get_consultation_collection()
 
     result = consultation_collection.update_one(
         {'_id': ObjectId(consultation_id)},
@@ -77,9 +226,7 @@ def update_consultation_in_database(consultation_id, new_patient_id, new_doctor_
 
 
 def delete_consultation_from_database(consultation_id):
-    client = pymongo.MongoClient("mongodb://localhost:27017/")
-    database = client["medicineProjectNoSQL"]
-    consultation_collection = database["consultatii"]
+    consultation_collection = get_consultation_collection()
 
     result = consultation_collection.delete_one({'_id': ObjectId(consultation_id)})
 
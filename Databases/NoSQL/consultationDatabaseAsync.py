@@ -0,0 +1,104 @@
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from Databases.NoSQL.consultationDatabase import CONSULTATION_INDEXES, CONSULTATION_SORT, CONSULTATION_UNIQUE_INDEX, \
+    DUPLICATE_CONSULTATIONS_PIPELINE, build_consultation_document, build_consultation_filter, \
+    select_consultation_indexes
+from Databases.NoSQL.mongoClient import get_async_mongo_database
+
+
+def get_consultation_collection():
+    return get_async_mongo_database()["consultatii"]
+
+
+async def ensure_consultation_indexes():
+    collection = get_consultation_collection()
+    indexes = CONSULTATION_INDEXES
+
+    if CONSULTATION_UNIQUE_INDEX not in await collection.index_information():
+        cursor = await collection.aggregate(DUPLICATE_CONSULTATIONS_PIPELINE)
+        indexes = select_consultation_indexes(await cursor.to_list(None))
+
+    return await collection.create_indexes(indexes)
+
+
+async def iter_consultation_batches(consultation_filter, batch_size):
+    cursor = get_consultation_collection().find(consultation_filter).sort(CONSULTATION_SORT).batch_size(batch_size)
+
+    try:
+        batch = []
+
+        async for consultation in cursor:
+            batch.append(consultation)
+
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+    finally:
+        await cursor.close()
+
+
+async def add_consultation_document(patient_id, doctor_id, date, diagnostic, investigations):
+    consultation_collection = get_consultation_collection()
+
+    consultation_document = build_consultation_document(patient_id, doctor_id, date, diagnostic, investigations)
+
+    await consultation_collection.insert_one(consultation_document)
+
+    return consultation_document
+
+
+async def add_consultation_documents(consultation_documents):
+    consultation_collection = get_consultation_collection()
+
+    try:
+        await consultation_collection.insert_many(consultation_documents, ordered=False)
+    except BulkWriteError as error:
+        return error.details.get("writeErrors", [])
+
+    return []
+
+
+async def get_consultations_by_attribute(searched, attribute, limit=0, after=None):
+    consultation_collection = get_consultation_collection()
+
+    consultations = await (consultation_collection.find(build_consultation_filter(searched, attribute, after))
+                           .sort(CONSULTATION_SORT).limit(limit).to_list(None))
+
+    return consultations
+
+
+async def get_consultation_from_database(patient_id, doctor_id, date, diagnostic):
+    consultation_collection = get_consultation_collection()
+
+    consultations = await consultation_collection.find({"patient_id": patient_id, "doctor_id": doctor_id, "date": date,
+                                                        "diagnostic": diagnostic}).to_list(None)
+
+    return consultations
+
+
+async def update_consultation_in_database(consultation_id, new_patient_id, new_doctor_id, new_date, new_diagnostic):
+    consultation_collection = get_consultation_collection()
+
+    await consultation_collection.update_one(
+        {'_id': ObjectId(consultation_id)},
+        {
+            '$set': {
+                'patient_id': new_patient_id,
+                'doctor_id': new_doctor_id,
+                'date': new_date,
+                'diagnostic': new_diagnostic
+            }
+        }
+    )
+
+
+async def delete_consultation_from_database(consultation_id):
+    consultation_collection = get_consultation_collection()
+
+    result = await consultation_collection.delete_one({'_id': ObjectId(consultation_id)})
+
+    return result.deleted_count == 1
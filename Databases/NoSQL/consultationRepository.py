@@ -0,0 +1,110 @@
+from config import CONSULTATION_BACKEND
+from Databases.NoSQL import consultationDatabase, consultationDatabaseAsync
+from Databases.NoSQL.consultationDatabase import CONSULTATION_UNIQUE_INDEX
+from Databases.NoSQL.mongoClient import init_mongo_client, close_mongo_client, init_async_mongo_client, \
+    close_async_mongo_client
+from Databases.dataAccess import run_in_db_thread
+
+
+class SyncConsultationRepository:
+    # pymongo sincron, fiecare apel ruleaza in pool-ul de thread-uri pentru baze de date
+    # indexul unic lipseste cat timp exista consultatii duplicate (vezi select_consultation_indexes); pana atunci
+    # duplicatele sunt cautate inainte de scriere
+    has_unique_index = False
+
+    async def startup(self):
+        init_mongo_client()
+        created_indexes = await run_in_db_thread(consultationDatabase.ensure_consultation_indexes)
+        self.has_unique_index = CONSULTATION_UNIQUE_INDEX in created_indexes
+
+    async def shutdown(self):
+        close_mongo_client()
+
+    async def add_consultation_document(self, patient_id, doctor_id, date, diagnostic, investigations):
+        return await run_in_db_thread(consultationDatabase.add_consultation_document, patient_id, doctor_id, date,
+                                      diagnostic, investigations)
+
+    async def add_consultation_documents(self, consultation_documents):
+        return await run_in_db_thread(consultationDatabase.add_consultation_documents, consultation_documents)
+
+    async def get_consultations_by_attribute(self, searched, attribute, limit=0, after=None):
+        return await run_in_db_thread(consultationDatabase.get_consultations_by_attribute, searched, attribute,
+                                      limit, after)
+
+    async def iter_consultation_batches(self, consultation_filter, batch_size):
+        # cursorul ramane deschis intre pasi, iar fiecare lot este citit tot in pool-ul de thread-uri
+        cursor = await run_in_db_thread(consultationDatabase.open_consultation_cursor, consultation_filter, batch_size)
+
+        try:
+            while True:
+                batch = await run_in_db_thread(consultationDatabase.fetch_consultation_batch, cursor, batch_size)
+
+                if not batch:
+                    break
+
+                yield batch
+        finally:
+            await run_in_db_thread(cursor.close)
+
+    async def get_consultation_from_database(self, patient_id, doctor_id, date, diagnostic):
+        return await run_in_db_thread(consultationDatabase.get_consultation_from_database, patient_id, doctor_id,
+                                      date, diagnostic)
+
+    async def update_consultation_in_database(self, consultation_id, new_patient_id, new_doctor_id, new_date,
+                                              new_diagnostic):
+        return await run_in_db_thread(consultationDatabase.update_consultation_in_database, consultation_id,
+                                      new_patient_id, new_doctor_id, new_date, new_diagnostic)
+
+    async def delete_consultation_from_database(self, consultation_id):
+        return await run_in_db_thread(consultationDatabase.delete_consultation_from_database, consultation_id)
+
+
+class AsyncConsultationRepository:
+    # clientul asincron pymongo, interogarile nu mai ocupa thread-uri din pool
+    has_unique_index = False
+
+    async def startup(self):
+        init_async_mongo_client()
+        created_indexes = await consultationDatabaseAsync.ensure_consultation_indexes()
+        self.has_unique_index = CONSULTATION_UNIQUE_INDEX in created_indexes
+
+    async def shutdown(self):
+        await close_async_mongo_client()
+
+    async def add_consultation_document(self, patient_id, doctor_id, date, diagnostic, investigations):
+        return await consultationDatabaseAsync.add_consultation_document(patient_id, doctor_id, date, diagnostic,
+                                                                         investigations)
+
+    async def add_consultation_documents(self, consultation_documents):
+        return await consultationDatabaseAsync.add_consultation_documents(consultation_documents)
+
+    async def get_consultations_by_attribute(self, searched, attribute, limit=0, after=None):
+        return await consultationDatabaseAsync.get_consultations_by_attribute(searched, attribute, limit, after)
+
+    def iter_consultation_batches(self, consultation_filter, batch_size):
+        return consultationDatabaseAsync.iter_consultation_batches(consultation_filter, batch_size)
+
+    async def get_consultation_from_database(self, patient_id, doctor_id, date, diagnostic):
+        return await consultationDatabaseAsync.get_consultation_from_database(patient_id, doctor_id, date,
+                                                                              diagnostic)
+
+    async def update_consultation_in_database(self, consultation_id, new_patient_id, new_doctor_id, new_date,
+                                              new_diagnostic):
+        return await consultationDatabaseAsync.update_consultation_in_database(consultation_id, new_patient_id,
+                                                                               new_doctor_id, new_date,
+                                                                               new_diagnostic)
+
+    async def delete_consultation_from_database(self, consultation_id):
+        return await consultationDatabaseAsync.delete_consultation_from_database(consultation_id)
+
+
+def create_consultation_repository(backend):
+    if backend == "sync":
+        return SyncConsultationRepository()
+    if backend == "async":
+        return AsyncConsultationRepository()
+
+    raise ValueError(f"Unknown consultation backend: {backend}")
+
+
+consultation_repository = create_consultation_repository(CONSULTATION_BACKEND)
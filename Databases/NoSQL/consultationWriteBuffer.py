@@ -0,0 +1,71 @@
+import asyncio
+
+from config import CONSULTATION_WRITE_BATCH_SIZE, CONSULTATION_WRITE_DELAY_MS
+from Databases.NoSQL.consultationDatabase import create_write_error
+from Databases.NoSQL.consultationRepository import consultation_repository
+
+
+class ConsultationWriteBuffer:
+    # inserarile concurente sunt adunate intr-un lot trimis cu un singur insert_many; fiecare apelant primeste
+    # rezultatul propriului document (documentul inserat sau eroarea lui, de exemplu DuplicateKeyError)
+    def __init__(self, repository, max_batch_size, max_delay):
+        self.repository = repository
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.pending = []
+        self.flush_handle = None
+        self.flush_tasks = set()
+
+    async def add(self, consultation_document):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((consultation_document, future))
+
+        if len(self.pending) >= self.max_batch_size:
+            self.start_flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self.start_flush)
+
+        return await future
+
+    def start_flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+
+        if batch:
+            task = asyncio.ensure_future(self.flush(batch))
+            self.flush_tasks.add(task)
+            task.add_done_callback(self.flush_tasks.discard)
+
+    async def flush(self, batch):
+        try:
+            write_errors = await self.repository.add_consultation_documents([document for document, _ in batch])
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        write_errors = {write_error["index"]: write_error for write_error in write_errors}
+
+        for index, (document, future) in enumerate(batch):
+            # apelantul poate fi anulat (de exemplu clientul a inchis conexiunea) inainte de terminarea lotului
+            if future.done():
+                continue
+
+            if index in write_errors:
+                future.set_exception(create_write_error(write_errors[index]))
+            else:
+                future.set_result(document)
+
+    async def close(self):
+        self.start_flush()
+
+        if self.flush_tasks:
+            await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+
+
+consultation_write_buffer = ConsultationWriteBuffer(consultation_repository, CONSULTATION_WRITE_BATCH_SIZE,
+                                                    CONSULTATION_WRITE_DELAY_MS / 1000)
@@ -0,0 +1,88 @@
+import threading
+
+import pymongo
+
+from config import MONGO_URI, MONGO_DATABASE, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, \
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS
+from Databases.queryStats import MongoCommandTimer
+
+MOCK_MONGO_SCHEME = "mongomock://"
+
+_client = None
+_client_lock = threading.Lock()
+
+_async_client = None
+
+
+def _client_options():
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        # timpul fiecarei comenzi este adunat la request-ul care a trimis-o (vezi Databases/queryStats.py)
+        "event_listeners": [MongoCommandTimer()],
+    }
+
+
+def init_mongo_client():
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            if MONGO_URI.startswith(MOCK_MONGO_SCHEME):
+                # mongomock este importat doar cand este folosit; nu trimite evenimente de monitorizare a comenzilor
+                import mongomock
+
+                _client = mongomock.MongoClient()
+            else:
+                _client = pymongo.MongoClient(MONGO_URI, **_client_options())
+
+    return _client
+
+
+def get_mongo_database():
+    # clientul este creat la pornirea aplicatiei, dar si la prima utilizare daca modulul este folosit din afara ei
+    client = _client if _client is not None else init_mongo_client()
+
+    return client[MONGO_DATABASE]
+
+
+def close_mongo_client():
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def init_async_mongo_client():
+    global _async_client
+
+    if _async_client is None:
+        if MONGO_URI.startswith(MOCK_MONGO_SCHEME):
+            raise RuntimeError("The in-process MongoDB stand-in only supports CONSULTATION_BACKEND=sync.")
+
+        # clientul asincron (pymongo >= 4.9) este importat doar cand backend-ul asincron este folosit
+        from pymongo import AsyncMongoClient
+
+        _async_client = AsyncMongoClient(MONGO_URI, **_client_options())
+
+    return _async_client
+
+
+def get_async_mongo_database():
+    client = _async_client if _async_client is not None else init_async_mongo_client()
+
+    return client[MONGO_DATABASE]
+
+
+async def close_async_mongo_client():
+    global _async_client
+
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -1,19 +1,112 @@
+import time
+from contextvars import ContextVar
+
 import peewee
-from peewee import Model, MySQLDatabase
+from peewee import Model
+from playhouse.pool import PooledMySQLDatabase, PooledSqliteDatabase
+
+from config import MYSQL_DATABASE, MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_POOL_MAX_CONNECTIONS, \
+    MYSQL_POOL_STALE_TIMEOUT, MYSQL_POOL_WAIT_TIMEOUT, SQL_BACKEND, SQLITE_PATH
+from Databases.queryStats import record_mysql_query
+
+_request_db_state = ContextVar("request_db_state", default=None)
+
+
+class RequestConnectionState(object):
+    # conexiunea este legata de request-ul curent si nu de thread, deoarece apelurile aceluiasi request pot rula pe
+    # thread-uri diferite din pool-ul din Databases/dataAccess.py; in afara unui request se foloseste starea pe thread
+    def __init__(self):
+        object.__setattr__(self, "_thread_state", peewee._ConnectionLocal())
+
+    def _current(self):
+        state = _request_db_state.get()
+        return state if state is not None else self._thread_state
+
+    def __getattr__(self, name):
+        return getattr(self._current(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._current(), name, value)
+
+
+class QueryTimingMixin(object):
+    # toate interogarile peewee trec prin execute_sql, deci numarul lor si timpul petrecut in baza de date sunt adunate
+    # aici pentru request-ul curent (vezi Databases/queryStats.py)
+    def execute_sql(self, sql, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute_sql(sql, *args, **kwargs)
+        finally:
+            record_mysql_query(sql, time.perf_counter() - start)
+
+
+class TimedPooledMySQLDatabase(QueryTimingMixin, PooledMySQLDatabase):
+    pass
+
+
+class TimedPooledSqliteDatabase(QueryTimingMixin, PooledSqliteDatabase):
+    pass
+
+
+# pool-ul nu deschide nicio conexiune la creare; prima conexiune este deschisa de prima interogare, iar schema este
+# creata si actualizata de migrari (Databases/SQL/migrations.py), nu la importul acestui modul
+if SQL_BACKEND == "sqlite":
+    # conexiunile sunt folosite din thread-urile din Databases/dataAccess.py, iar WAL permite citiri in paralel cu o
+    # scriere; cheile straine sunt verificate, ca in MySQL (InnoDB)
+    db = TimedPooledSqliteDatabase(SQLITE_PATH, max_connections=MYSQL_POOL_MAX_CONNECTIONS,
+                                   stale_timeout=MYSQL_POOL_STALE_TIMEOUT, timeout=MYSQL_POOL_WAIT_TIMEOUT,
+                                   check_same_thread=False,
+                                   pragmas={"journal_mode": "wal", "busy_timeout": 10000, "foreign_keys": 1})
+else:
+    db = TimedPooledMySQLDatabase(MYSQL_DATABASE, user=MYSQL_USER, password=MYSQL_PASSWORD, host=MYSQL_HOST,
+                                  port=MYSQL_PORT, max_connections=MYSQL_POOL_MAX_CONNECTIONS,
+                                  stale_timeout=MYSQL_POOL_STALE_TIMEOUT, timeout=MYSQL_POOL_WAIT_TIMEOUT)
+db._state = RequestConnectionState()
+
+
+def begin_request_connection_state():
+    return _request_db_state.set(peewee._ConnectionState())
+
+
+def release_request_connection():
+    # conexiunea este luata din pool la prima interogare a request-ului si este returnata aici
+    if not db.is_closed():
+        db.close()
+
+
+def end_request_connection_state(token):
+    _request_db_state.reset(token)
+
 
-db = MySQLDatabase('medicineProject', user='root', password='victor', host='localhost', port=3306)
+def get_pool_stats():
+    return {
+        "max_connections": db._max_connections,
+        "stale_timeout": db._stale_timeout,
+        "wait_timeout": db._wait_timeout,
+        "in_use": len(db._in_use),
+        "idle": len(db._connections),
+    }
 
 
 class BaseModel(Model):
     class Meta:
         database = db
 
+    @classmethod
+    def find_existing(cls, field, values):
+        # o singura interogare IN pentru un lot intreg, in locul unui get_or_none pentru fiecare valoare
+        if not values:
+            return set()
+
+        return {value for value, in cls.select(field).where(field.in_(list(values))).tuples()}
+
 
 class Doctors(BaseModel):
     last_name = peewee.CharField(max_length=30)
     first_name = peewee.CharField(max_length=30)
-    email = peewee.CharField(max_length=50)
-    phone_number = peewee.CharField(max_length=10)
+    # indecsi unici (vezi migrarea 3 din migrations.py); duplicatele sunt respinse de baza de date cu IntegrityError
+    email = peewee.CharField(max_length=50, unique=True)
+    phone_number = peewee.CharField(max_length=10, unique=True)
     speciality = peewee.CharField(max_length=30)
 
     @classmethod
@@ -53,8 +146,8 @@ class Patients(BaseModel):
     cnp = peewee.CharField(max_length=13, primary_key=True)
     lastName = peewee.CharField(max_length=30)
     firstName = peewee.CharField(max_length=30)
-    email = peewee.CharField(max_length=50)
-    phoneNumber = peewee.CharField(max_length=10)
+    email = peewee.CharField(max_length=50, unique=True)
+    phoneNumber = peewee.CharField(max_length=10, unique=True)
     age = peewee.IntegerField()
     birthday = peewee.DateField()
     is_active = peewee.BooleanField()
@@ -83,20 +176,85 @@ class Patients(BaseModel):
         except cls.DoesNotExist:
             return None
 
+    @classmethod
+    def export_chunk(cls, fields, after_cnp=None, limit=1000):
+        # paginare keyset dupa cheia primara, astfel fiecare bucata este o citire scurta pe index; tuples() si
+        # iterator() evita crearea obiectelor model si pastrarea randurilor in cache-ul interogarii
+        query = cls.select(*fields).order_by(cls.cnp).limit(limit)
+
+        if after_cnp is not None:
+            query = query.where(cls.cnp > after_cnp)
+
+        return list(query.tuples().iterator())
+
+
 class Appointments(BaseModel):
     id_patient = peewee.ForeignKeyField(Patients, backref='appointments')
     id_doctor = peewee.ForeignKeyField(Doctors, backref='appointments')
     date = peewee.DateField(formats='%d %m %Y')
     status = peewee.CharField(max_length=30)
 
+    class Meta:
+        # indecsi pentru listarea programarilor filtrate si ordonate dupa data (vezi migrarea 1 din migrations.py)
+        indexes = (
+            (('id_doctor', 'date'), False),
+            (('id_patient', 'date'), False),
+            (('status', 'date'), False),
+            (('date',), False),
+        )
+
+    @classmethod
+    def filter_conditions(cls, doctor_id=None, patient_cnp=None, status=None, date_from=None, date_to=None, ids=None):
+        conditions = []
+
+        if ids is not None:
+            conditions.append(cls.id.in_(ids))
+        if doctor_id is not None:
+            conditions.append(cls.id_doctor == doctor_id)
+        if patient_cnp is not None:
+            conditions.append(cls.id_patient == patient_cnp)
+        if status is not None:
+            conditions.append(cls.status == status)
+        if date_from is not None:
+            conditions.append(cls.date >= date_from)
+        if date_to is not None:
+            conditions.append(cls.date <= date_to)
+
+        return conditions
+
+    @classmethod
+    def filter_page(cls, doctor_id=None, patient_cnp=None, status=None, date_from=None, date_to=None, after=None,
+                    limit=None):
+        query = cls.select()
+
+        for condition in cls.filter_conditions(doctor_id, patient_cnp, status, date_from, date_to):
+            query = query.where(condition)
+
+        # paginare de tip keyset dupa (date, id)
+        if after is not None:
+            after_date, after_id = after
+            query = query.where((cls.date > after_date) | ((cls.date == after_date) & (cls.id > after_id)))
+
+        return query.order_by(cls.date, cls.id).limit(limit)
+
+    @classmethod
+    def update_status(cls, new_status, ids=None, doctor_id=None, patient_cnp=None, date_from=None, date_to=None):
+        # un singur UPDATE pentru toate programarile selectate; cele care au deja statusul cerut nu sunt rescrise
+        query = cls.update(status=new_status).where(cls.status != new_status)
+
+        for condition in cls.filter_conditions(doctor_id, patient_cnp, None, date_from, date_to, ids):
+            query = query.where(condition)
+
+        return query.execute()
+
 
 class Accounts(BaseModel):
     last_name = peewee.CharField(max_length=30)
     first_name = peewee.CharField(max_length=30)
     user_name = peewee.CharField(max_length=30)
-    user_email = peewee.CharField(max_length=30)
-    password = peewee.CharField(max_length=30)
+    user_email = peewee.CharField(max_length=30, unique=True)
+    # hash-ul bcrypt are 60 de caractere
+    password = peewee.CharField(max_length=60)
 
 
-db.connect()
-db.create_tables([Doctors, Patients, Appointments, Accounts], safe=True)
+MODELS = [Doctors, Patients, Appointments, Accounts]
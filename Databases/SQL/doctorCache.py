@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import defaultdict
+
+from config import DOCTOR_CACHE_TTL
+from Databases.SQL.SQLDatabase import db, Doctors
+from Databases.dataAccess import run_in_db_thread
+from Utils.pubsub import pubsub
+
+DOCTOR_CACHE_CHANNEL = "doctors"
+
+
+class DoctorCache:
+    # tabela de doctori este mica si se modifica rar, deci este tinuta in memorie, indexata dupa id, email si
+    # specialitate; modificarile sunt anuntate pe canalul de pub/sub, iar fiecare proces isi invalideaza copia; canalul
+    # nu ajunge la ceilalti worker-i, asa ca tot continutul este aruncat la fiecare ttl secunde
+    def __init__(self, pubsub, channel, ttl):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.by_id = {}
+        self.by_email = {}
+        self.by_speciality = defaultdict(dict)
+        # creste la fiecare invalidare; o citire din baza de date inceputa inainte de invalidare nu mai este salvata
+        self.generation = 0
+        # indexul de specialitati este complet doar dupa o incarcare a intregii tabele fara invalidari ulterioare
+        self.complete = False
+        self.expires_at = time.monotonic() + ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def startup(self):
+        self.pubsub.subscribe(self.channel, self.drop)
+        await run_in_db_thread(self.load_outside_request)
+
+    async def shutdown(self):
+        self.pubsub.unsubscribe(self.channel, self.drop)
+
+    def load_outside_request(self):
+        # la pornire nu exista un request care sa elibereze conexiunea (vezi Middleware/dbSessionMiddleware.py)
+        with db.connection_context():
+            return self.load()
+
+    def load(self):
+        with self.lock:
+            generation = self.generation
+            loaded_at = time.monotonic()
+
+        doctors = list(Doctors.select().order_by(Doctors.id))
+
+        with self.lock:
+            if generation != self.generation:
+                return False
+
+            self.clear()
+
+            for doctor in doctors:
+                self.store(doctor)
+
+            self.complete = True
+            self.expires_at = loaded_at + self.ttl
+
+        return True
+
+    def clear(self):
+        self.by_id = {}
+        self.by_email = {}
+        self.by_speciality = defaultdict(dict)
+
+    def expire(self):
+        # apelat cu lock-ul luat; o citire din baza de date inceputa inainte de expirare nu mai este salvata
+        now = time.monotonic()
+
+        if now >= self.expires_at:
+            self.clear()
+            self.generation += 1
+            self.complete = False
+            self.expires_at = now + self.ttl
+
+    def store(self, doctor):
+        self.by_id[doctor.id] = doctor
+        self.by_email[doctor.email] = doctor
+        self.by_speciality[doctor.speciality][doctor.id] = doctor
+
+    def store_if_current(self, doctor, generation):
+        with self.lock:
+            if generation == self.generation:
+                self.store(doctor)
+
+    def lookup(self, index_name, key):
+        with self.lock:
+            self.expire()
+            doctor = getattr(self, index_name).get(key)
+
+            if doctor is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            return doctor, self.generation
+
+    async def get_by_id(self, doctor_id):
+        doctor, generation = self.lookup("by_id", doctor_id)
+
+        if doctor is None:
+            doctor = await run_in_db_thread(Doctors.get_or_none, id=doctor_id)
+
+            if doctor is not None:
+                self.store_if_current(doctor, generation)
+
+        return doctor
+
+    async def get_by_email(self, email):
+        doctor, generation = self.lookup("by_email", email)
+
+        if doctor is None:
+            doctor = await run_in_db_thread(Doctors.get_or_none, email=email)
+
+            if doctor is not None:
+                self.store_if_current(doctor, generation)
+
+        return doctor
+
+    async def get_current_by_id(self, doctor_id):
+        # folosit dupa ce o scriere a fost respinsa de cheia straina: un doctor sters de alt worker poate fi inca in
+        # cache, deci doctorul este citit din baza de date, iar o intrare veche este scoasa din cache
+        with self.lock:
+            generation = self.generation
+
+        doctor = await run_in_db_thread(Doctors.get_or_none, id=doctor_id)
+
+        if doctor is not None:
+            self.store_if_current(doctor, generation)
+        else:
+            with self.lock:
+                cached = doctor_id in self.by_id
+
+            # copia locala este invalidata doar in acest proces, restul worker-ilor o arunca la expirare
+            if cached:
+                self.drop({"id": doctor_id})
+
+        return doctor
+
+    async def get_by_speciality(self, speciality):
+        with self.lock:
+            self.expire()
+            complete = self.complete
+
+            if complete:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        # dupa o invalidare se reincarca toata tabela, care este mica, in locul unei interogari pe specialitate
+        if not complete and not await run_in_db_thread(self.load):
+            return await run_in_db_thread(list, Doctors.filter(Doctors.speciality == speciality)
+                                          .order_by(Doctors.id))
+
+        with self.lock:
+            return sorted(self.by_speciality.get(speciality, {}).values(), key=lambda doctor: doctor.id)
+
+    def invalidate(self, doctor_id):
+        # apelat de handler-ele care creeaza, modifica sau sterg un doctor, dupa ce modificarea a fost salvata
+        self.pubsub.publish(self.channel, {"id": doctor_id})
+
+    def drop(self, message):
+        with self.lock:
+            doctor = self.by_id.pop(message["id"], None)
+
+            if doctor is not None:
+                if self.by_email.get(doctor.email) is doctor:
+                    del self.by_email[doctor.email]
+                self.by_speciality[doctor.speciality].pop(doctor.id, None)
+
+            self.generation += 1
+            self.complete = False
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "size": len(self.by_id),
+                "complete": self.complete,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+            }
+
+
+doctor_cache = DoctorCache(pubsub, DOCTOR_CACHE_CHANNEL, DOCTOR_CACHE_TTL)
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import peewee
+from playhouse.migrate import SchemaMigrator, migrate
+
+from Databases.SQL.SQLDatabase import BaseModel, db, Doctors, Patients, Accounts
+
+
+class SchemaVersion(BaseModel):
+    version = peewee.IntegerField(primary_key=True)
+    name = peewee.CharField(max_length=100)
+    applied_at = peewee.DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = "schema_version"
+
+
+def add_missing_indexes(migrator, table, indexes):
+    # indecsii declarati in Meta.indexes sunt creati deja de create_tables pentru tabelele noi, deci se adauga doar
+    # cei care lipsesc din tabelele existente
+    existing_indexes = {index.name for index in db.get_indexes(table)}
+    operations = []
+
+    for columns, unique in indexes:
+        if "_".join((table,) + columns) not in existing_indexes:
+            operations.append(migrator.add_index(table, columns, unique))
+
+    return operations
+
+
+def create_initial_schema(migrator):
+    # schema initiala este inghetata aici, in forma tabelelor create inainte de migrari (fara indecsi, cu parola de 30
+    # de caractere); modelele din SQLDatabase.py descriu schema de dupa ultima migrare, deci nu pot fi folosite aici,
+    # altfel o baza de date noua ar primi deja modificarile migrarilor urmatoare; clasele au aceleasi nume ca modelele,
+    # pentru ca peewee deriva din ele numele indecsilor cheilor straine
+    class InitialModel(peewee.Model):
+        class Meta:
+            database = db
+
+    class Doctors(InitialModel):
+        last_name = peewee.CharField(max_length=30)
+        first_name = peewee.CharField(max_length=30)
+        email = peewee.CharField(max_length=50)
+        phone_number = peewee.CharField(max_length=10)
+        speciality = peewee.CharField(max_length=30)
+
+    class Patients(InitialModel):
+        cnp = peewee.CharField(max_length=13, primary_key=True)
+        lastName = peewee.CharField(max_length=30)
+        firstName = peewee.CharField(max_length=30)
+        email = peewee.CharField(max_length=50)
+        phoneNumber = peewee.CharField(max_length=10)
+        age = peewee.IntegerField()
+        birthday = peewee.DateField()
+        is_active = peewee.BooleanField()
+
+    class Appointments(InitialModel):
+        id_patient = peewee.ForeignKeyField(Patients)
+        id_doctor = peewee.ForeignKeyField(Doctors)
+        date = peewee.DateField(formats='%d %m %Y')
+        status = peewee.CharField(max_length=30)
+
+    class Accounts(InitialModel):
+        last_name = peewee.CharField(max_length=30)
+        first_name = peewee.CharField(max_length=30)
+        user_name = peewee.CharField(max_length=30)
+        user_email = peewee.CharField(max_length=30)
+        password = peewee.CharField(max_length=30)
+
+    # safe=True nu modifica tabelele deja existente, deci migrarea poate fi aplicata si bazelor de date create inainte
+    # de existenta ei
+    db.create_tables([Doctors, Patients, Appointments, Accounts], safe=True)
+
+    return []
+
+
+def add_appointment_listing_indexes(migrator):
+    return add_missing_indexes(migrator, "appointments", [
+        (("id_doctor_id", "date"), False),
+        (("id_patient_id", "date"), False),
+        (("status", "date"), False),
+        (("date",), False),
+    ])
+
+
+def widen_account_password(migrator):
+    return [migrator.alter_column_type("accounts", "password", peewee.CharField(max_length=60))]
+
+
+def find_duplicate_values(model, field, limit=10):
+    return [value for value, in model.select(field).group_by(field)
+            .having(peewee.fn.COUNT(model._meta.primary_key) > 1).limit(limit).tuples()]
+
+
+def add_unique_contact_indexes(migrator):
+    unique_fields = [(Patients, Patients.email), (Patients, Patients.phoneNumber), (Doctors, Doctors.email),
+                     (Doctors, Doctors.phone_number), (Accounts, Accounts.user_email)]
+
+    # un index unic nu poate fi creat peste valori duplicate, care trebuie rezolvate manual inainte de migrare
+    for model, field in unique_fields:
+        duplicate_values = find_duplicate_values(model, field)
+
+        if duplicate_values:
+            raise RuntimeError(f"Cannot add a unique index on {model._meta.table_name}.{field.column_name}, "
+                               f"duplicate values: {', '.join(map(str, duplicate_values))}")
+
+    return (add_missing_indexes(migrator, "patients", [(("email",), True), (("phoneNumber",), True)]) +
+            add_missing_indexes(migrator, "doctors", [(("email",), True), (("phone_number",), True)]) +
+            add_missing_indexes(migrator, "accounts", [(("user_email",), True)]))
+
+
+# migrarile se aplica in ordinea versiunilor, o singura data pentru fiecare baza de date
+MIGRATIONS = [
+    (0, "initial_schema", create_initial_schema),
+    (1, "appointment_listing_indexes", add_appointment_listing_indexes),
+    (2, "widen_account_password", widen_account_password),
+    (3, "unique_contact_indexes", add_unique_contact_indexes),
+]
+
+
+def get_applied_versions():
+    return {schema_version.version for schema_version in SchemaVersion.select()}
+
+
+def run_migrations():
+    applied_migrations = []
+
+    with db.connection_context():
+        db.create_tables([SchemaVersion], safe=True)
+
+        applied_versions = get_applied_versions()
+        migrator = SchemaMigrator.from_database(db)
+
+        for version, name, migration in MIGRATIONS:
+            if version in applied_versions:
+                continue
+
+            with db.atomic():
+                migrate(*migration(migrator))
+                SchemaVersion.create(version=version, name=name)
+
+            applied_migrations.append(f"{version} {name}")
+
+    return applied_migrations
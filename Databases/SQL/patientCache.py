@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import PATIENT_CACHE_SIZE, PATIENT_CACHE_TTL, PATIENT_CACHE_NEGATIVE_TTL
+from Databases.SQL.SQLDatabase import Patients
+from Databases.dataAccess import run_in_db_thread
+from Utils.pubsub import pubsub
+
+PATIENT_CACHE_CHANNEL = "patients"
+
+
+class PatientCache:
+    # cache LRU marginit pentru cautarile de pacienti dupa CNP; fiecare intrare expira dupa ttl secunde, iar CNP-urile
+    # inexistente sunt tinute (cu valoarea None) doar negative_ttl secunde
+    def __init__(self, pubsub, channel, max_size, ttl, negative_ttl):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def startup(self):
+        self.pubsub.subscribe(self.channel, self.drop)
+
+    async def shutdown(self):
+        self.pubsub.unsubscribe(self.channel, self.drop)
+        self.clear()
+
+    def lookup(self, cnp):
+        with self.lock:
+            entry = self.entries.get(cnp)
+
+            if entry is not None:
+                patient, expires_at = entry
+
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(cnp)
+
+                    if patient is None:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+
+                    return True, patient, self.generation
+
+                del self.entries[cnp]
+
+            self.misses += 1
+
+            return False, None, self.generation
+
+    def store(self, cnp, patient, generation):
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl if patient is not None else self.negative_ttl
+
+        with self.lock:
+            # o invalidare aparuta in timpul citirii din baza de date face rezultatul citirii nesigur
+            if generation != self.generation:
+                return
+
+            self.entries[cnp] = (patient, time.monotonic() + ttl)
+            self.entries.move_to_end(cnp)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    async def get(self, cnp):
+        cnp = str(cnp)
+        found, patient, generation = self.lookup(cnp)
+
+        if not found:
+            patient = await run_in_db_thread(Patients.get_or_none, cnp=cnp)
+            self.store(cnp, patient, generation)
+
+        return patient
+
+    async def get_current(self, cnp):
+        # folosit inainte de scrierile care refera pacientul: intrarea locala poate fi veche daca pacientul a fost creat
+        # sau sters de alt worker, deci pacientul este citit din baza de date, iar rezultatul inlocuieste intrarea
+        cnp = str(cnp)
+
+        with self.lock:
+            generation = self.generation
+
+        patient = await run_in_db_thread(Patients.get_or_none, cnp=cnp)
+        self.store(cnp, patient, generation)
+
+        return patient
+
+    def invalidate(self, cnp):
+        # apelat dupa crearea, modificarea sau stergerea unui pacient; crearea sterge si intrarile negative
+        self.pubsub.publish(self.channel, {"cnp": str(cnp)})
+
+    def drop(self, message):
+        with self.lock:
+            self.entries.pop(message["cnp"], None)
+            self.generation += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.negative_hits + self.misses
+
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "negative_ttl": self.negative_ttl,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.negative_hits) / lookups if lookups else None,
+            }
+
+
+patient_cache = PatientCache(pubsub, PATIENT_CACHE_CHANNEL, PATIENT_CACHE_SIZE, PATIENT_CACHE_TTL,
+                             PATIENT_CACHE_NEGATIVE_TTL)
@@ -0,0 +1,35 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DB_THREAD_POOL_SIZE
+
+_executor = None
+
+
+def get_db_executor():
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_THREAD_POOL_SIZE, thread_name_prefix="db-worker")
+
+    return _executor
+
+
+async def run_in_db_thread(function, *args, **kwargs):
+    # peewee si pymongo sunt sincrone, asa ca fiecare apel catre baza de date se executa intr-un thread separat
+    # pentru a nu bloca event loop-ul; contextul (contextvars) al request-ului curent este pastrat
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+
+    return await loop.run_in_executor(get_db_executor(),
+                                      functools.partial(context.run, function, *args, **kwargs))
+
+
+def shutdown_db_executor():
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,108 @@
+import logging
+from contextvars import ContextVar
+
+from pymongo import monitoring
+
+from config import SLOW_QUERY_THRESHOLD_MS
+
+_request_query_stats = ContextVar("request_query_stats", default=None)
+
+_slow_query_threshold = SLOW_QUERY_THRESHOLD_MS / 1000
+
+slow_query_logger = logging.getLogger("medicineProject.slowQueries")
+
+
+class QueryStats(object):
+    __slots__ = ("scope", "mysql_queries", "mysql_time", "mongo_commands", "mongo_time")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.mysql_queries = 0
+        self.mysql_time = 0.0
+        self.mongo_commands = 0
+        self.mongo_time = 0.0
+
+    @property
+    def route(self):
+        # sablonul rutei (de ex. /api/medicineProject/patients/{patient_cnp}) este pus in scope de router; cererile
+        # fara ruta sunt grupate impreuna ca numarul de serii din metrici sa nu creasca cu fiecare URL
+        route = self.scope.get("route")
+        return route.path if route is not None else "unmatched"
+
+
+def begin_query_stats(scope):
+    # obiectul este partajat (nu copiat) cu thread-urile din Databases/dataAccess.py, deoarece run_in_db_thread copiaza
+    # contextul request-ului, deci interogarile facute acolo ajung in statisticile request-ului curent
+    stats = QueryStats(scope)
+
+    return stats, _request_query_stats.set(stats)
+
+
+def get_query_stats():
+    return _request_query_stats.get()
+
+
+def end_query_stats(token):
+    _request_query_stats.reset(token)
+
+
+def _log_slow_query(stats, database, statement, duration):
+    route = f"{stats.scope['method']} {stats.route}" if stats is not None else "outside of a request"
+    slow_query_logger.warning("Slow %s query (%.1f ms) on %s: %s", database, duration * 1000, route, statement)
+
+
+def record_mysql_query(sql, duration):
+    stats = _request_query_stats.get()
+
+    if stats is not None:
+        stats.mysql_queries += 1
+        stats.mysql_time += duration
+
+    # doar textul SQL este scris in log, fara parametri, care pot contine date personale ale pacientilor
+    if _slow_query_threshold and duration >= _slow_query_threshold:
+        _log_slow_query(stats, "MySQL", sql, duration)
+
+
+def record_mongo_command(duration):
+    stats = _request_query_stats.get()
+
+    if stats is not None:
+        stats.mongo_commands += 1
+        stats.mongo_time += duration
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    # pymongo apeleaza listener-ul in thread-ul (sau task-ul asincron) care a trimis comanda, deci in contextul
+    # request-ului care a facut interogarea
+    def __init__(self):
+        # numele comenzii si colectia, pastrate intre started si succeeded doar cand logul interogarilor lente este
+        # activ
+        self.pending_commands = {}
+
+    def started(self, event):
+        if _slow_query_threshold:
+            # pentru comenzile pe o colectie (find, insert, aggregate...) valoarea comenzii este numele colectiei;
+            # filtrele nu sunt pastrate, din acelasi motiv ca parametrii interogarilor MySQL
+            statement = f"{event.command_name} {event.database_name}"
+            collection = event.command.get(event.command_name)
+
+            if isinstance(collection, str):
+                statement += f".{collection}"
+
+            self.pending_commands[(event.connection_id, event.request_id)] = statement
+
+    def _finish(self, event):
+        duration = event.duration_micros / 1_000_000
+        record_mongo_command(duration)
+
+        if _slow_query_threshold:
+            statement = self.pending_commands.pop((event.connection_id, event.request_id), event.command_name)
+
+            if duration >= _slow_query_threshold:
+                _log_slow_query(_request_query_stats.get(), "MongoDB", statement, duration)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
@@ -0,0 +1,26 @@
+from Databases.SQL.SQLDatabase import db, begin_request_connection_state, release_request_connection, \
+    end_request_connection_state
+from Databases.dataAccess import run_in_db_thread
+
+
+class DatabaseSessionMiddleware:
+    # middleware ASGI (nu BaseHTTPMiddleware) pentru ca conexiunea sa fie eliberata abia dupa ce raspunsul a fost
+    # trimis complet, inclusiv in cazul raspunsurilor de tip streaming
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = begin_request_connection_state()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # starea conexiunii este cea a request-ului curent (vezi RequestConnectionState), deci poate fi citita din
+            # event loop; request-urile care nu au folosit MySQL (metrici, raspunsuri 304, cache, MongoDB) nu mai
+            # asteapta un thread liber din pool doar pentru a nu elibera nimic
+            if not db.is_closed():
+                await run_in_db_thread(release_request_connection)
+            end_request_connection_state(token)
@@ -0,0 +1,37 @@
+import time
+
+from Databases.queryStats import begin_query_stats, end_query_stats
+from Utils.metrics import metrics
+
+
+class MetricsMiddleware:
+    # middleware ASGI exterior: masoara request-ul complet, inclusiv corpul raspunsurilor de tip streaming si
+    # eliberarea conexiunii MySQL facuta de DatabaseSessionMiddleware
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+            await send(message)
+
+        stats, token = begin_query_stats(scope)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            end_query_stats(token)
+
+            metrics.observe_request(scope["method"], stats.route, status_code, duration, stats.mysql_time,
+                                    stats.mongo_time)
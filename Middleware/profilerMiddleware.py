@@ -0,0 +1,81 @@
+import cProfile
+import random
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from config import PROFILER_SAMPLE_RATE
+from Databases.queryStats import get_query_stats
+from Utils.profiling import is_valid_profile_token, create_profile_id, save_profile
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+# endpoint-urile de administrare ale profilurilor cer acelasi token, dar nu sunt profilate
+PROFILES_PATH_PREFIX = "/api/medicineProject/admin/profiles"
+
+
+class ProfilerMiddleware:
+    # adaugat in main.py doar daca profilarea este configurata; request-urile neselectate trec printr-o singura cautare
+    # de antet (si un random() daca exista esantionare)
+    def __init__(self, app):
+        self.app = app
+        # cProfile masoara tot thread-ul event loop-ului si nu poate fi pornit de doua ori in acelasi timp, deci este
+        # profilat un singur request pe proces; celelalte request-uri selectate in acest timp ruleaza normal
+        self.profiling = False
+
+    def _is_selected(self, scope):
+        if scope["path"].startswith(PROFILES_PATH_PREFIX):
+            return False
+
+        for name, value in scope["headers"]:
+            if name == PROFILE_TOKEN_HEADER:
+                return is_valid_profile_token(value.decode("latin-1"))
+
+        return PROFILER_SAMPLE_RATE > 0 and random.random() < PROFILER_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.profiling or not self._is_selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = create_profile_id()
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+
+            # identificatorul profilului este trimis clientului, pentru a-l cere apoi de la endpoint-ul de administrare
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode("latin-1")),
+                ]
+
+            await send(message)
+
+        self.profiling = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            self.profiling = False
+
+            # timpul petrecut in thread-urile bazelor de date nu apare in profil, asa ca interogarile request-ului sunt
+            # salvate alaturi; este salvat doar sablonul rutei, nu calea, care poate contine CNP-ul unui pacient
+            stats = get_query_stats()
+            metadata = {
+                "method": scope["method"],
+                "route": stats.route if stats is not None else None,
+                "status": status_code,
+                "duration_ms": duration * 1000,
+                "created_at": time.time(),
+                "mysql_queries": stats.mysql_queries if stats is not None else None,
+                "mysql_time_ms": stats.mysql_time * 1000 if stats is not None else None,
+                "mongo_commands": stats.mongo_commands if stats is not None else None,
+                "mongo_time_ms": stats.mongo_time * 1000 if stats is not None else None,
+            }
+
+            await run_in_threadpool(save_profile, profile_id, profiler, metadata)
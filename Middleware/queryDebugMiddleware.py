@@ -0,0 +1,29 @@
+from Databases.queryStats import get_query_stats
+
+
+class QueryDebugMiddleware:
+    # adauga la raspuns numarul si durata interogarilor facute de request (activ doar cu QUERY_DEBUG_HEADERS=1);
+    # statisticile sunt create de MetricsMiddleware, care trebuie sa fie exterior acestui middleware
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_query_headers(message):
+            stats = get_query_stats()
+
+            # la raspunsurile de tip streaming antetele contin doar interogarile facute inainte de primul bloc
+            if message["type"] == "http.response.start" and stats is not None:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-mysql-queries", str(stats.mysql_queries).encode("latin-1")),
+                    (b"x-mysql-time-ms", f"{stats.mysql_time * 1000:.2f}".encode("latin-1")),
+                    (b"x-mongo-commands", str(stats.mongo_commands).encode("latin-1")),
+                    (b"x-mongo-time-ms", f"{stats.mongo_time * 1000:.2f}".encode("latin-1")),
+                ]
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_query_headers)
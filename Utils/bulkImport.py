@@ -0,0 +1,58 @@
+from itertools import islice
+
+from Utils.jsonResponse import decode_json
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def parse_import_body(body: bytes, content_type: str):
+    # corpul este fie un array JSON, fie NDJSON (un obiect JSON pe fiecare linie nevida)
+    try:
+        if content_type.split(";")[0].strip().lower() in NDJSON_MEDIA_TYPES:
+            return [decode_json(line) for line in body.splitlines() if line.strip()]
+
+        rows = decode_json(body)
+    except ValueError:
+        raise ValueError("The request body is not valid JSON or NDJSON")
+
+    if not isinstance(rows, list):
+        raise ValueError("The request body must be a JSON array")
+
+    return rows
+
+
+def format_validation_errors(error):
+    messages = []
+
+    for detail in error.errors():
+        location = ".".join(str(part) for part in detail["loc"])
+        messages.append(f"{location}: {detail['msg']}" if location else detail["msg"])
+
+    return messages
+
+
+def chunked(items, size):
+    iterator = iter(items)
+
+    while True:
+        chunk = list(islice(iterator, size))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def create_row_error(row_number, status_code, detail):
+    # acelasi format pentru toate importurile: randul (numarat de la 1), codul HTTP pe care l-ar fi primit randul
+    # trimis singur si mesajele de eroare
+    return {"index": row_number, "status": status_code, "detail": detail}
+
+
+def create_import_report(row_count, imported, errors):
+    return {
+        "received": row_count,
+        "imported": imported,
+        "failed": len(errors),
+        "errors": sorted(errors, key=lambda error: error["index"]),
+    }
@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response, status
+
+from Utils.jsonResponse import encode_json
+
+# fara max-age clientul pastreaza raspunsul, dar il revalideaza la fiecare cerere cu If-None-Match
+ETAG_CACHE_CONTROL = "no-cache"
+
+
+def compute_etag(body: bytes):
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag):
+    if_none_match = request.headers.get("if-none-match")
+
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    # If-None-Match foloseste comparatia slaba, deci prefixul W/ este ignorat
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified_response(etag):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag,
+                                                                       "Cache-Control": ETAG_CACHE_CONTROL})
+
+
+def conditional_json(request: Request, response: Response, content):
+    # ETag-ul este hash-ul corpului serializat, deci se schimba doar cand se schimba raspunsul
+    body = encode_json(content)
+    etag = compute_etag(body)
+
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    json_response = Response(body, status_code=response.status_code or status.HTTP_200_OK,
+                             media_type="application/json",
+                             headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
+    json_response.raw_headers.extend(response.raw_headers)
+
+    return json_response
+
+
+class ETagStore:
+    # ultimul ETag trimis pentru fiecare resursa; un If-None-Match egal cu el primeste 304 fara nicio interogare, pana
+    # cand un handler de modificare invalideaza resursa prin canalul de pub/sub sau pana cand trec ttl secunde;
+    # invalidarile ajung doar la procesul curent, deci ttl limiteaza cat timp alt worker poate raspunde cu un ETag vechi
+    def __init__(self, pubsub, channel, max_size, ttl):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.etags = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.pubsub.subscribe(self.channel, self.drop)
+
+    def match(self, request: Request, key):
+        with self.lock:
+            entry = self.etags.get(key)
+
+            if entry is not None:
+                etag, expires_at = entry
+
+                if expires_at <= time.monotonic():
+                    del self.etags[key]
+                elif etag_matches(request, etag):
+                    self.etags.move_to_end(key)
+                    self.hits += 1
+                    return etag
+
+            self.misses += 1
+            return None
+
+    def store(self, key, etag, generation):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+
+        with self.lock:
+            if generation != self.generation:
+                return
+
+            self.etags[key] = (etag, time.monotonic() + self.ttl)
+            self.etags.move_to_end(key)
+
+            while len(self.etags) > self.max_size:
+                self.etags.popitem(last=False)
+
+    def invalidate(self, key):
+        self.pubsub.publish(self.channel, {"key": key})
+
+    def invalidate_all(self):
+        self.pubsub.publish(self.channel, {"key": None})
+
+    def drop(self, message):
+        with self.lock:
+            if message["key"] is None:
+                self.etags.clear()
+            else:
+                self.etags.pop(message["key"], None)
+
+            self.generation += 1
+
+    def get_stats(self):
+        with self.lock:
+            return {"size": len(self.etags), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,53 @@
+import csv
+import io
+import zlib
+
+from starlette.responses import StreamingResponse
+
+from Utils.jsonResponse import encode_json
+
+
+async def ndjson_stream(batches, build_row):
+    # fiecare lot devine un singur bloc de bytes, cate o linie JSON pentru fiecare rand
+    async for batch in batches:
+        yield b"".join(encode_json(build_row(row)) + b"\n" for row in batch)
+
+
+async def csv_stream(header, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    async for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+        # bufferul este golit dupa fiecare lot, deci contine cel mult un lot de randuri
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def gzip_stream(chunks):
+    # wbits cu 16 adaugat produce format gzip; compresia se face incremental, pe masura ce sosesc blocurile
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+
+    async for chunk in chunks:
+        compressed_chunk = compressor.compress(chunk)
+
+        if compressed_chunk:
+            yield compressed_chunk
+
+    yield compressor.flush()
+
+
+def export_response(chunks, media_type, filename, compress=False):
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if compress:
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
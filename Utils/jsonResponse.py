@@ -0,0 +1,40 @@
+import json
+
+from fastapi import Response, status
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_json(content) -> bytes:
+    # orjson serializeaza direct in bytes si stie sa converteasca date/datetime; daca nu este instalat se foloseste
+    # modulul json standard cu acelasi format compact
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=str).encode("utf-8")
+
+
+def decode_json(content):
+    if orjson is not None:
+        return orjson.loads(content)
+
+    return json.loads(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return encode_json(content)
+
+
+def render_json(response: Response, content):
+    # un Response returnat direct nu mai trece prin jsonable_encoder; codul de stare si header-ele setate pe
+    # raspunsul injectat in handler sunt copiate pe raspunsul final
+    json_response = FastJSONResponse(content, status_code=response.status_code or status.HTTP_200_OK)
+    json_response.raw_headers.extend(response.raw_headers)
+
+    return json_response
@@ -0,0 +1,11 @@
+class LinkTemplate:
+    # link-urile HATEOAS ale unei resurse difera doar prin identificator, asa ca sufixele si metodele sunt pregatite o
+    # singura data, iar pentru fiecare rand se construieste doar href-ul
+    def __init__(self, base_href, links):
+        self.base_href = base_href
+        self.links = tuple(links)
+
+    def render(self, identifier):
+        resource_href = f"{self.base_href}/{identifier}"
+
+        return {name: {"href": resource_href + suffix, "type": method} for name, suffix, method in self.links}
@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+
+from config import METRICS_DIRECTORY, METRICS_FLUSH_INTERVAL
+
+# limitele superioare (in secunde) ale bucket-urilor histogramelor
+REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+DB_DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# numele fisierului cu valorile acestui proces in METRICS_DIRECTORY; un worker repornit primeste un fisier nou, chiar
+# daca sistemul de operare refoloseste pid-ul, deci valorile workerului oprit nu sunt suprascrise
+METRICS_SNAPSHOT_NAME = f"{os.getpid()}-{uuid.uuid4().hex}.json"
+
+logger = logging.getLogger("medicineProject.metrics")
+
+
+class Histogram(object):
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # un contor pentru fiecare bucket si unul pentru valorile mai mari decat ultima limita; valorile cumulate cerute
+        # de formatul Prometheus sunt calculate doar la generarea raspunsului
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+def _render_histograms(lines, name, help_text, histograms, label_names):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+
+    for key, histogram in sorted(histograms.items()):
+        labels = _format_labels(zip(label_names, key))
+        cumulative_count = 0
+
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative_count += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative_count}')
+
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+class MetricsRegistry(object):
+    # metricile sunt actualizate doar din event loop (de middleware), deci nu au nevoie de lock-uri; fiecare proces
+    # worker are propriile valori, care sunt adunate cu ale celorlalti worker-i prin METRICS_DIRECTORY (vezi
+    # render_shared_metrics)
+    def __init__(self):
+        self.requests = {}
+        self.durations = {}
+        self.db_durations = {}
+
+    def observe_request(self, method, route, status_code, duration, mysql_time, mongo_time):
+        request_key = (method, route, status_code)
+        self.requests[request_key] = self.requests.get(request_key, 0) + 1
+
+        self._observe(self.durations, (method, route), REQUEST_DURATION_BUCKETS, duration)
+
+        # timpul in baza de date este inregistrat doar pentru request-urile care au folosit-o
+        if mysql_time:
+            self._observe(self.db_durations, (method, route, "mysql"), DB_DURATION_BUCKETS, mysql_time)
+        if mongo_time:
+            self._observe(self.db_durations, (method, route, "mongo"), DB_DURATION_BUCKETS, mongo_time)
+
+    @staticmethod
+    def _observe(histograms, key, buckets, value):
+        histogram = histograms.get(key)
+
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+
+        histogram.observe(value)
+
+    def snapshot(self):
+        return {
+            "requests": [[*key, count] for key, count in self.requests.items()],
+            "durations": self._snapshot_histograms(self.durations),
+            "db_durations": self._snapshot_histograms(self.db_durations),
+        }
+
+    @staticmethod
+    def _snapshot_histograms(histograms):
+        return [[list(key), histogram.counts, histogram.sum, histogram.count] for key, histogram in histograms.items()]
+
+    def merge(self, snapshot):
+        for *key, count in snapshot["requests"]:
+            key = tuple(key)
+            self.requests[key] = self.requests.get(key, 0) + count
+
+        self._merge_histograms(self.durations, snapshot["durations"], REQUEST_DURATION_BUCKETS)
+        self._merge_histograms(self.db_durations, snapshot["db_durations"], DB_DURATION_BUCKETS)
+
+    @staticmethod
+    def _merge_histograms(histograms, snapshot, buckets):
+        for key, counts, total, count in snapshot:
+            key = tuple(key)
+            histogram = histograms.get(key)
+
+            if histogram is None:
+                histogram = histograms[key] = Histogram(buckets)
+
+            histogram.counts = [current + added for current, added in zip(histogram.counts, counts)]
+            histogram.sum += total
+            histogram.count += count
+
+    def render(self):
+        lines = [
+            "# HELP http_requests_total Number of HTTP requests by route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+
+        for (method, route, status_code), count in sorted(self.requests.items()):
+            labels = _format_labels([("method", method), ("route", route), ("status", status_code)])
+            lines.append(f"http_requests_total{{{labels}}} {count}")
+
+        _render_histograms(lines, "http_request_duration_seconds", "Time spent handling a request.", self.durations,
+                           ("method", "route"))
+        _render_histograms(lines, "http_request_db_duration_seconds",
+                           "Time a request spent waiting on MySQL or MongoDB queries.", self.db_durations,
+                           ("method", "route", "database"))
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def save_metrics_snapshot(directory, snapshot):
+    # fisierul este inlocuit atomic, deci ceilalti worker-i nu citesc niciodata un fisier scris pe jumatate
+    os.makedirs(directory, exist_ok=True)
+
+    path = os.path.join(directory, METRICS_SNAPSHOT_NAME)
+    temporary_path = f"{path}.tmp"
+
+    with open(temporary_path, "w", encoding="utf-8") as snapshot_file:
+        json.dump(snapshot, snapshot_file)
+    os.replace(temporary_path, path)
+
+
+def render_shared_metrics(directory, snapshot):
+    # valorile acestui proces sunt salvate inainte de citire, deci sunt la zi; ale celorlalti worker-i sunt cele
+    # salvate ultima data (cel mult METRICS_FLUSH_INTERVAL secunde in urma); fisierele worker-ilor opriti raman, astfel
+    # incat contoarele nu scad cand un worker este repornit
+    save_metrics_snapshot(directory, snapshot)
+
+    registry = MetricsRegistry()
+
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".json"):
+            try:
+                with open(entry.path, encoding="utf-8") as snapshot_file:
+                    registry.merge(json.load(snapshot_file))
+            except (OSError, ValueError):
+                continue
+
+    return registry.render()
+
+
+class MetricsSnapshotWriter:
+    # salveaza periodic valorile procesului in METRICS_DIRECTORY, ca sa fie gasite de worker-ul care raspunde la
+    # /metrics; fara METRICS_DIRECTORY nu face nimic
+    def __init__(self, registry, directory, interval):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self.task = None
+
+    async def startup(self):
+        if self.directory:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
+
+    async def save(self):
+        try:
+            await run_in_threadpool(save_metrics_snapshot, self.directory, self.registry.snapshot())
+        except OSError:
+            logger.warning("Could not save the metrics snapshot in %s", self.directory, exc_info=True)
+
+    async def shutdown(self):
+        if self.task is None:
+            return
+
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+        await self.save()
+
+
+metrics_snapshot_writer = MetricsSnapshotWriter(metrics, METRICS_DIRECTORY, METRICS_FLUSH_INTERVAL)
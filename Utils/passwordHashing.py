@@ -0,0 +1,62 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+from config import BCRYPT_ROUNDS, PASSWORD_HASHING_PROCESSES
+
+_executor = None
+
+
+def get_password_executor():
+    global _executor
+
+    if _executor is None:
+        # bcrypt consuma CPU, asa ca ruleaza in procese separate si nu blocheaza event loop-ul sau GIL-ul
+        _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASHING_PROCESSES,
+                                        mp_context=multiprocessing.get_context("spawn"))
+
+    return _executor
+
+
+def shutdown_password_executor():
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def get_hash_rounds(hashed_password: str):
+    # formatul hash-ului bcrypt este $2b$<rounds>$<salt si hash>
+    return int(hashed_password.split("$")[2])
+
+
+def _hash_password(password: str, rounds: int):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _verify_password(password: str, hashed_password: str, rounds: int):
+    if not bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8")):
+        return False, None
+
+    # parola este corecta, dar hash-ul a fost calculat cu alt cost decat cel configurat acum
+    if get_hash_rounds(hashed_password) != rounds:
+        return True, _hash_password(password, rounds)
+
+    return True, None
+
+
+async def hash_password(password: str):
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(get_password_executor(), _hash_password, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed_password: str):
+    # returneaza (parola_corecta, hash_nou); hash_nou este diferit de None doar daca parola trebuie salvata din nou
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(get_password_executor(), _verify_password, password, hashed_password,
+                                      BCRYPT_ROUNDS)
@@ -0,0 +1,185 @@
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+
+from config import PROFILER_SECRET, PROFILER_SAMPLE_RATE, PROFILER_DIRECTORY, PROFILER_MAX_PROFILES
+
+PROFILING_ENABLED = bool(PROFILER_SECRET) or PROFILER_SAMPLE_RATE > 0
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# arborele de apeluri este limitat ca sa ramana lizibil: adancimea maxima si ponderea minima (din timpul total) a unui
+# apel pentru a fi afisat
+CALL_TREE_MAX_DEPTH = 12
+CALL_TREE_MIN_SHARE = 0.01
+
+
+def check_profiler_settings():
+    # profilurile sunt citite doar cu un token semnat cu PROFILER_SECRET; fara el, profilurile esantionate ar fi scrise
+    # pe disc fara sa poata fi cerute vreodata
+    if PROFILER_SAMPLE_RATE > 0 and not PROFILER_SECRET:
+        raise RuntimeError("PROFILER_SAMPLE_RATE requires PROFILER_SECRET, which is needed to retrieve the profiles.")
+
+
+def _sign(expires):
+    return hmac.new(PROFILER_SECRET.encode("utf-8"), str(expires).encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def create_profile_token(ttl):
+    # formatul este <momentul expirarii, in secunde unix>.<semnatura HMAC-SHA256 a momentului expirarii>
+    expires = int(time.time()) + ttl
+
+    return f"{expires}.{_sign(expires)}"
+
+
+def is_valid_profile_token(token):
+    if not PROFILER_SECRET:
+        return False
+
+    expires, _, signature = token.partition(".")
+
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+
+    return hmac.compare_digest(signature, _sign(int(expires)))
+
+
+def _profile_paths(profile_id):
+    return (os.path.join(PROFILER_DIRECTORY, f"{profile_id}.prof"),
+            os.path.join(PROFILER_DIRECTORY, f"{profile_id}.json"))
+
+
+def create_profile_id():
+    return uuid.uuid4().hex
+
+
+def save_profile(profile_id, profiler, metadata):
+    # profilurile sunt scrise pe disc si nu tinute in memorie, astfel incat endpoint-ul de administrare le gaseste
+    # indiferent de procesul worker care a rulat request-ul profilat; metadatele sunt scrise ultimele, deci un profil
+    # apare in lista doar dupa ce este complet
+    os.makedirs(PROFILER_DIRECTORY, exist_ok=True)
+
+    stats_path, metadata_path = _profile_paths(profile_id)
+
+    profiler.dump_stats(stats_path)
+    with open(metadata_path, "w", encoding="utf-8") as metadata_file:
+        json.dump({"id": profile_id, **metadata}, metadata_file)
+
+    _remove_old_profiles()
+
+
+def _remove_old_profiles():
+    try:
+        metadata_files = sorted((entry for entry in os.scandir(PROFILER_DIRECTORY) if entry.name.endswith(".json")),
+                                key=lambda entry: entry.stat().st_mtime, reverse=True)
+    except FileNotFoundError:
+        # alt worker sterge profilurile vechi in acelasi timp
+        return
+
+    for entry in metadata_files[PROFILER_MAX_PROFILES:]:
+        for path in _profile_paths(entry.name[:-len(".json")]):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILER_DIRECTORY):
+        return []
+
+    profiles = []
+
+    for entry in os.scandir(PROFILER_DIRECTORY):
+        if entry.name.endswith(".json"):
+            try:
+                with open(entry.path, encoding="utf-8") as metadata_file:
+                    profiles.append(json.load(metadata_file))
+            except (OSError, ValueError):
+                # profilul a fost sters intre timp de alt worker sau nu a fost scris complet
+                continue
+
+    return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+
+def _function_name(function):
+    filename, line, name = function
+    return f"{name} ({filename}:{line})" if line else name
+
+
+def _build_call_tree(stats, function, total_time, depth, path):
+    _, calls, own_time, cumulative_time, _ = stats.stats[function]
+    node = {
+        "function": _function_name(function),
+        "calls": calls,
+        "own_time": own_time,
+        "cumulative_time": cumulative_time,
+        "children": [],
+    }
+
+    if depth >= CALL_TREE_MAX_DEPTH:
+        return node
+
+    callees = sorted(stats.all_callees.get(function, {}).items(), key=lambda item: item[1][3], reverse=True)
+
+    for callee, (_, _, _, callee_cumulative_time) in callees:
+        # apelurile recursive sunt oprite la prima repetare, iar cele neglijabile nu sunt afisate
+        if callee in path or callee_cumulative_time < total_time * CALL_TREE_MIN_SHARE:
+            continue
+
+        node["children"].append(_build_call_tree(stats, callee, total_time, depth + 1, path | {callee}))
+
+    return node
+
+
+def load_profile(profile_id, top_functions):
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+
+    stats_path, metadata_path = _profile_paths(profile_id)
+
+    try:
+        with open(metadata_path, encoding="utf-8") as metadata_file:
+            metadata = json.load(metadata_file)
+        stats = pstats.Stats(stats_path)
+    except (OSError, ValueError, EOFError):
+        return None
+
+    stats.calc_callees()
+
+    functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    total_time = functions[0][1][3] if functions else 0.0
+
+    # radacinile arborelui sunt functiile care nu au fost apelate de alte functii profilate
+    roots = [function for function, (_, _, _, _, callers) in functions if not callers]
+
+    return {
+        **metadata,
+        "top_functions": [
+            {"function": _function_name(function), "calls": calls, "primitive_calls": primitive_calls,
+             "own_time": own_time, "cumulative_time": cumulative_time}
+            for function, (primitive_calls, calls, own_time, cumulative_time, _) in functions[:top_functions]
+        ],
+        "call_tree": [_build_call_tree(stats, root, total_time, 0, {root}) for root in roots],
+    }
+
+
+def render_profile_text(profile_id, top_functions):
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+
+    stats_path, _ = _profile_paths(profile_id)
+    output = io.StringIO()
+
+    try:
+        pstats.Stats(stats_path, stream=output).sort_stats("cumulative").print_stats(top_functions)
+    except (OSError, ValueError, EOFError):
+        return None
+
+    return output.getvalue()
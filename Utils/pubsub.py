@@ -0,0 +1,32 @@
+import threading
+from collections import defaultdict
+
+
+class LocalPubSub:
+    # inlocuitor in proces pentru un broker de mesaje (de exemplu Redis pub/sub): mesajele publicate pe un canal sunt
+    # livrate imediat abonatilor din acelasi proces; un broker real ar livra mesajele si celorlalte procese worker, care
+    # pana atunci vad modificarile facute de alt worker doar dupa expirarea cache-urilor (vezi serve.py)
+    def __init__(self):
+        self.subscribers = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel, callback):
+        with self.lock:
+            self.subscribers[channel].append(callback)
+
+    def unsubscribe(self, channel, callback):
+        with self.lock:
+            if callback in self.subscribers[channel]:
+                self.subscribers[channel].remove(callback)
+
+    def publish(self, channel, message):
+        with self.lock:
+            callbacks = list(self.subscribers[channel])
+
+        for callback in callbacks:
+            callback(message)
+
+        return len(callbacks)
+
+
+pubsub = LocalPubSub()
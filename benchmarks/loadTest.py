@@ -0,0 +1,364 @@
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SPECIALITIES = ["Chirurg", "Ortoped", "Pediatru", "Oftalmolog", "Cardiolog", "Neurolog"]
+DIAGNOSTICS = ["Alzheimer", "Astigmatism", "Cataracta", "Cistita", "Diabet", "Enterocolita", "Entorsa", "Epilepsie",
+               "Fractura", "Gripa", "Hepatita", "Hipermetropie", "Indigestie", "Luxatie", "Miocardita", "Miopie",
+               "Parkinson", "Pericardita", "Raceala"]
+STATUSES = ["Onorata", "Neprezentat", "Anulata"]
+
+# ponderea fiecarei operatii in volumul de request-uri
+DEFAULT_MIX = "patient_lookup=40,appointment_listing=30,consultation_create=20,account_signup=10"
+
+# numerele conturilor create sunt unice intre clienti si intre incalzire si masurare
+_account_numbers = itertools.count(1)
+
+
+def server_environment(arguments, sqlite_path):
+    # aplicatia ruleaza pe SQLite si pe stand-in-ul MongoDB din proces, fara servere externe
+    environment = dict(os.environ)
+    environment.update({
+        "SQL_BACKEND": "sqlite",
+        "SQLITE_PATH": sqlite_path,
+        "MONGO_URI": "mongomock://",
+        "CONSULTATION_BACKEND": "sync",
+        "PROFILER_SECRET": "",
+        "PROFILER_SAMPLE_RATE": "0",
+        "QUERY_DEBUG_HEADERS": "0",
+        "SLOW_QUERY_THRESHOLD_MS": "0",
+    })
+
+    if arguments.bcrypt_rounds is not None:
+        environment["BCRYPT_ROUNDS"] = str(arguments.bcrypt_rounds)
+
+    return environment
+
+
+def start_server(arguments, sqlite_path):
+    return subprocess.Popen([sys.executable, str(ROOT / "serve.py"), "--workers", "1", "--host", arguments.host,
+                             "--port", str(arguments.port)], cwd=ROOT, env=server_environment(arguments, sqlite_path),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(host, port, timeout):
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request("GET", "/docs")
+            connection.getresponse().read()
+            connection.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+
+    return False
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def send_request(connection, method, path, body=None):
+    connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                       headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    content = response.read()
+
+    return response.status, content
+
+
+def random_date(generator):
+    return (date(2015, 1, 1) + timedelta(days=generator.randrange(3650))).isoformat()
+
+
+def seed_data(arguments):
+    # datele sunt create prin API (endpoint-urile de creare in bloc), ca la un client real
+    generator = random.Random(arguments.seed)
+    connection = http.client.HTTPConnection(arguments.host, arguments.port, timeout=300)
+
+    doctor_ids = []
+    for index in range(arguments.doctors):
+        status_code, content = send_request(connection, "POST", "/api/medicineProject/doctors", {
+            "last_name": "Doctor", "first_name": f"Benchmark{index:04d}", "email": f"doctor{index}@benchmark.ro",
+            "phone_number": f"0790{index:06d}", "speciality": SPECIALITIES[index % len(SPECIALITIES)],
+        })
+        if status_code != 201:
+            raise RuntimeError(f"Seeding doctors failed with status {status_code}: {content[:200]!r}")
+        doctor_ids.append(json.loads(content)["doctor"]["id"])
+
+    patient_cnps = [f"1{index:012d}" for index in range(1, arguments.patients + 1)]
+    patients = [
+        {"cnp": cnp, "lastName": "Patient", "firstName": f"Benchmark{index:06d}",
+         "email": f"patient{index}@benchmark.ro", "phoneNumber": f"07{index:08d}", "age": 40,
+         "birthday": "1985-05-05", "is_active": True}
+        for index, cnp in enumerate(patient_cnps)
+    ]
+    status_code, content = send_request(connection, "POST", "/api/medicineProject/patients/import/", patients)
+    if status_code != 201 or json.loads(content)["failed"]:
+        raise RuntimeError(f"Seeding patients failed with status {status_code}: {content[:200]!r}")
+
+    appointments = [
+        {"id_patient": int(generator.choice(patient_cnps)), "id_doctor": generator.choice(doctor_ids),
+         "date": random_date(generator), "status": generator.choice(STATUSES)}
+        for _ in range(arguments.appointments)
+    ]
+    status_code, content = send_request(connection, "POST", "/api/medicineProject/appointments/bulk/",
+                                        appointments)
+    if status_code != 201:
+        raise RuntimeError(f"Seeding appointments failed with status {status_code}: {content[:200]!r}")
+
+    connection.close()
+
+    return doctor_ids, patient_cnps
+
+
+class Workload(object):
+    def __init__(self, doctor_ids, patient_cnps, seed):
+        self.doctor_ids = doctor_ids
+        self.patient_cnps = patient_cnps
+        self.generator = random.Random(seed)
+
+    def patient_lookup(self):
+        return "GET", f"/api/medicineProject/patients/{self.generator.choice(self.patient_cnps)}", None
+
+    def appointment_listing(self):
+        return "GET", f"/api/medicineProject/appointments/?doctor_id={self.generator.choice(self.doctor_ids)}" \
+                      f"&limit=50", None
+
+    def consultation_create(self):
+        return "POST", "/api/medicineProject/consultations/", {
+            "id_patient": int(self.generator.choice(self.patient_cnps)),
+            "id_doctor": self.generator.choice(self.doctor_ids),
+            "date": random_date(self.generator),
+            "diagnostic": self.generator.choice(DIAGNOSTICS),
+            "investigations": "Analize de sange",
+        }
+
+    def account_signup(self):
+        name = f"benchmark{next(_account_numbers)}"
+
+        return "POST", "/api/medicineProject/accounts", {
+            "last_name": "Account", "first_name": "Benchmark", "user_name": name,
+            "user_email": f"{name}@benchmark.ro", "password": "Parola!2024",
+        }
+
+
+def run_client(arguments, mix, doctor_ids, patient_cnps, client_seed, deadline, results, lock):
+    workload = Workload(doctor_ids, patient_cnps, client_seed)
+    operations, weights = zip(*mix)
+    connection = http.client.HTTPConnection(arguments.host, arguments.port, timeout=60)
+    client_results = {operation: {"latencies": [], "statuses": {}} for operation in operations}
+
+    while time.monotonic() < deadline:
+        operation = workload.generator.choices(operations, weights)[0]
+        method, path, body = getattr(workload, operation)()
+        start = time.perf_counter()
+
+        try:
+            status_code, _ = send_request(connection, method, path, body)
+        except (OSError, http.client.HTTPException):
+            status_code = "connection_error"
+            connection.close()
+            connection = http.client.HTTPConnection(arguments.host, arguments.port, timeout=60)
+
+        operation_results = client_results[operation]
+        operation_results["latencies"].append(time.perf_counter() - start)
+        operation_results["statuses"][str(status_code)] = operation_results["statuses"].get(str(status_code), 0) + 1
+
+    connection.close()
+
+    with lock:
+        for operation, operation_results in client_results.items():
+            results[operation]["latencies"].extend(operation_results["latencies"])
+            for status_code, count in operation_results["statuses"].items():
+                results[operation]["statuses"][status_code] = results[operation]["statuses"].get(status_code, 0) + count
+
+
+def summarize(latencies, statuses, elapsed):
+    if not latencies:
+        return {"requests": 0, "errors": 0, "statuses": statuses, "throughput": 0.0}
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    # 404 si 409 sunt raspunsuri asteptate (de ex. o consultatie duplicata), doar 5xx si erorile de conexiune conteaza
+    errors = sum(count for status_code, count in statuses.items() if not status_code.isdigit() or
+                 int(status_code) >= 500)
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput": len(latencies) / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def drive_load(arguments, mix, doctor_ids, patient_cnps, phase, duration):
+    results = {operation: {"latencies": [], "statuses": {}} for operation, _ in mix}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    # fiecare client si fiecare etapa (incalzire, masurare) are propriul seed, altfel masurarea ar repeta consultatiile
+    # create la incalzire si ar primi doar 409
+    clients = [
+        threading.Thread(target=run_client, args=(arguments, mix, doctor_ids, patient_cnps,
+                                                  f"{arguments.seed}-{phase}-{index}", deadline, results, lock))
+        for index in range(arguments.concurrency)
+    ]
+
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {operation: summarize(operation_results["latencies"], operation_results["statuses"], elapsed)
+                 for operation, operation_results in results.items()}
+    all_latencies = [latency for operation_results in results.values() for latency in operation_results["latencies"]]
+    all_statuses = {}
+    for operation_results in results.values():
+        for status_code, count in operation_results["statuses"].items():
+            all_statuses[status_code] = all_statuses.get(status_code, 0) + count
+
+    return endpoints, summarize(all_latencies, all_statuses, elapsed)
+
+
+def parse_mix(mix):
+    operations = []
+
+    for item in mix.split(","):
+        operation, _, weight = item.partition("=")
+        if not hasattr(Workload, operation.strip()):
+            raise ValueError(f"Unknown operation: {operation}")
+        operations.append((operation.strip(), float(weight)))
+
+    return operations
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, baseline):
+    print(f"{'endpoint':<20} {'req/sec':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}  statuses")
+
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, result in rows:
+        if not result["requests"]:
+            print(f"{name:<20} {'-':>9}")
+            continue
+
+        line = f"{name:<20} {result['throughput']:>9,.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} " \
+               f"{result['p99_ms']:>8.2f} {result['errors']:>7}  {result['statuses']}"
+
+        previous = None
+        if baseline:
+            previous = baseline["total"] if name == "total" else baseline["endpoints"].get(name)
+
+        if previous and previous.get("requests"):
+            line += f"  (req/sec {result['throughput'] / previous['throughput'] - 1:+.1%}, " \
+                    f"p99 {result['p99_ms'] / previous['p99_ms'] - 1:+.1%} vs {baseline.get('commit')})"
+
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API against SQLite and an in-process MongoDB.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of measured load.")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unmeasured load before measuring.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent keep-alive clients.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights, as operation=weight,...")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--appointments", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=2024, help="Seed of the data and request generators.")
+    parser.add_argument("--bcrypt-rounds", type=int, help="Override BCRYPT_ROUNDS for the account signups.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--output",
+                        help="JSON results file (default: benchmarks/results/loadTest-<commit>.json, ignored by git).")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against.")
+    arguments = parser.parse_args()
+
+    mix = parse_mix(arguments.mix)
+    baseline = json.loads(Path(arguments.compare).read_text()) if arguments.compare else None
+
+    with tempfile.TemporaryDirectory() as directory:
+        process = start_server(arguments, os.path.join(directory, "benchmark.db"))
+
+        try:
+            if not wait_until_ready(arguments.host, arguments.port, arguments.startup_timeout):
+                raise RuntimeError("The server did not start.")
+
+            doctor_ids, patient_cnps = seed_data(arguments)
+
+            if arguments.warmup:
+                drive_load(arguments, mix, doctor_ids, patient_cnps, "warmup", arguments.warmup)
+
+            endpoints, total = drive_load(arguments, mix, doctor_ids, patient_cnps, "measure", arguments.duration)
+        finally:
+            stop_server(process)
+
+    commit = current_commit()
+    report = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {
+            "duration": arguments.duration,
+            "concurrency": arguments.concurrency,
+            "mix": dict(mix),
+            "doctors": arguments.doctors,
+            "patients": arguments.patients,
+            "appointments": arguments.appointments,
+            "seed": arguments.seed,
+            "bcrypt_rounds": arguments.bcrypt_rounds,
+        },
+        "endpoints": endpoints,
+        "total": total,
+    }
+
+    print_report(report, baseline)
+
+    # rezultatele sunt salvate implicit cu hash-ul commit-ului in nume, pentru comparatii cu --compare
+    output = Path(arguments.output) if arguments.output else \
+        ROOT / "benchmarks" / "results" / f"loadTest-{commit or 'uncommitted'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {output}")
+
+    return 1 if total["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
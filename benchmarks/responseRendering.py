@@ -0,0 +1,125 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+
+from Utils.jsonResponse import FastJSONResponse
+from Utils.links import LinkTemplate
+
+PATIENT_LINKS = LinkTemplate("/api/medicineProject/patients", [
+    ("self", "", "GET"),
+    ("update_cnp", "/cnp", "PUT"),
+    ("update_name", "/name", "PUT"),
+    ("update_email", "/email", "PUT"),
+    ("update_phone_number", "/phone_number", "PUT"),
+    ("update_age_and_birthday", "/age_and_birthday", "PUT"),
+    ("update_phone_is_active", "/is_active", "PUT"),
+    ("delete patient", "", "DELETE"),
+])
+
+
+def create_patients(count):
+    return [
+        SimpleNamespace(cnp=str(1990826000000 + index), lastName="Cabulea", firstName="Victor",
+                        email=f"patient{index}@gmail.com", phoneNumber="0748888555", age=24, birthday="1999-08-26",
+                        is_active=True)
+        for index in range(count)
+    ]
+
+
+def legacy_response_data(patient):
+    # forma initiala: fiecare link este construit cu un f-string separat, iar raspunsul trece prin jsonable_encoder
+    return {
+        "patient": {
+            "cnp": patient.cnp,
+            "lastName": patient.lastName,
+            "firstName": patient.firstName,
+            "email": patient.email,
+            "phoneNumber": patient.phoneNumber,
+            "age": patient.age,
+            "birthday": patient.birthday,
+            "is_active": patient.is_active,
+            "links": {
+                "self": {"href": f"/api/medicineProject/patients/{patient.cnp}", "type": "GET"},
+                "update_cnp": {"href": f"/api/medicineProject/patients/{patient.cnp}/cnp", "type": "PUT"},
+                "update_name": {"href": f"/api/medicineProject/patients/{patient.cnp}/name", "type": "PUT"},
+                "update_email": {"href": f"/api/medicineProject/patients/{patient.cnp}/email", "type": "PUT"},
+                "update_phone_number": {"href": f"/api/medicineProject/patients/{patient.cnp}/phone_number",
+                                        "type": "PUT"},
+                "update_age_and_birthday": {"href": f"/api/medicineProject/patients/{patient.cnp}/age_and_birthday",
+                                            "type": "PUT"},
+                "update_phone_is_active": {"href": f"/api/medicineProject/patients/{patient.cnp}/is_active",
+                                           "type": "PUT"},
+                "delete patient": {"href": f"/api/medicineProject/patients/{patient.cnp}", "type": "DELETE"}
+            }
+        },
+    }
+
+
+def template_response_data(patient):
+    return {
+        "patient": {
+            "cnp": patient.cnp,
+            "lastName": patient.lastName,
+            "firstName": patient.firstName,
+            "email": patient.email,
+            "phoneNumber": patient.phoneNumber,
+            "age": patient.age,
+            "birthday": patient.birthday,
+            "is_active": patient.is_active,
+            "links": PATIENT_LINKS.render(patient.cnp)
+        },
+    }
+
+
+def render_legacy(patients):
+    content = jsonable_encoder({"patients": [legacy_response_data(patient) for patient in patients]})
+
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def render_fast(patients):
+    return FastJSONResponse({"patients": [template_response_data(patient) for patient in patients]}).body
+
+
+def measure(render, patients, repeats):
+    best = float("inf")
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        render(patients)
+        best = min(best, time.perf_counter() - start)
+
+    return len(patients) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the rendering speed of list responses.")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of patients in the response.")
+    parser.add_argument("--repeats", type=int, default=5, help="Number of runs, the best one is reported.")
+    arguments = parser.parse_args()
+
+    patients = create_patients(arguments.rows)
+
+    if json.loads(render_legacy(patients)) != json.loads(render_fast(patients)):
+        print("The two renderers produce different responses.")
+        return 1
+
+    legacy_rate = measure(render_legacy, patients, arguments.repeats)
+    fast_rate = measure(render_fast, patients, arguments.repeats)
+
+    print(f"f-string links + jsonable_encoder + json: {legacy_rate:,.0f} rows/sec")
+    print(f"LinkTemplate + FastJSONResponse:           {fast_rate:,.0f} rows/sec")
+    print(f"Speedup: {fast_rate / legacy_rate:.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
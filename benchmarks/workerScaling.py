@@ -0,0 +1,209 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BENCHMARK_DOCTOR = {
+    "last_name": "Benchmark",
+    "first_name": "Doctor",
+    "email": "benchmark.doctor@gmail.com",
+    "phone_number": "0700000000",
+    "speciality": "Ortoped",
+}
+
+
+def send_json(host, port, method, path, body=None):
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                       headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    content = response.read()
+    connection.close()
+
+    return response.status, json.loads(content) if content else None
+
+
+def seed_read_paths(host, port, patient_count):
+    # datele sunt create prin API, iar conflictele (409) sunt ignorate, deci rularile repetate refolosesc aceleasi
+    # randuri; cititorii cer un medic, pacientii creati si lista programarilor medicului
+    send_json(host, port, "POST", "/api/medicineProject/doctors", BENCHMARK_DOCTOR)
+    _, doctors = send_json(host, port, "GET", f"/api/medicineProject/doctors/?email={BENCHMARK_DOCTOR['email']}")
+    doctor_id = doctors[0]["doctor"]["id"]
+
+    patients = [
+        {"cnp": f"29001{index:08d}", "lastName": "Benchmark", "firstName": "Patient",
+         "email": f"benchmark.patient{index}@gmail.com", "phoneNumber": f"07{index:08d}", "age": 34,
+         "birthday": "1990-01-01", "is_active": True}
+        for index in range(patient_count)
+    ]
+    send_json(host, port, "POST", "/api/medicineProject/patients/import/", patients)
+
+    appointments = [
+        {"id_patient": int(patient["cnp"]), "id_doctor": doctor_id, "date": "2024-01-01", "status": "Onorata"}
+        for patient in patients
+    ]
+    send_json(host, port, "POST", "/api/medicineProject/appointments/bulk/", appointments)
+
+    return [f"/api/medicineProject/doctors/{doctor_id}",
+            f"/api/medicineProject/appointments/?doctor_id={doctor_id}&limit=50"] + \
+        [f"/api/medicineProject/patients/{patient['cnp']}" for patient in patients]
+
+
+def start_server(workers, host, port):
+    # serverul este pornit exact ca in productie, prin serve.py, care aplica migrarile lipsa inainte de pornirea
+    # worker-ilor (dupa prima pornire nu mai ramane nicio migrare de aplicat)
+    return subprocess.Popen([sys.executable, str(ROOT / "serve.py"), "--workers", str(workers), "--host", host,
+                             "--port", str(port)], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(host, port, path, timeout):
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request("GET", path)
+            connection.getresponse().read()
+            connection.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+
+    return False
+
+
+def stop_server(process):
+    # SIGTERM declanseaza oprirea controlata: request-urile in curs sunt terminate inainte de inchiderea worker-ilor
+    process.send_signal(signal.SIGTERM)
+
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_client(host, port, paths, duration):
+    # fiecare client foloseste o singura conexiune keep-alive si trimite request-urile unul dupa altul
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    latencies = []
+    errors = 0
+    index = 0
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+
+        try:
+            connection.request("GET", paths[index % len(paths)])
+            response = connection.getresponse()
+            response.read()
+
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+
+        latencies.append(time.perf_counter() - start)
+        index += 1
+
+    connection.close()
+
+    return latencies, errors
+
+
+def measure(workers, arguments):
+    process = start_server(workers, arguments.host, arguments.port)
+
+    try:
+        if not wait_until_ready(arguments.host, arguments.port, arguments.paths[0], arguments.startup_timeout):
+            raise RuntimeError(f"The server with {workers} workers did not start.")
+
+        # o incalzire scurta umple cache-urile si pool-urile de conexiuni ale fiecarui worker
+        client_arguments = [(arguments.host, arguments.port, arguments.paths, arguments.warmup)] * arguments.clients
+        context = multiprocessing.get_context("spawn")
+
+        with context.Pool(arguments.clients) as pool:
+            pool.starmap(run_client, client_arguments)
+
+            client_arguments = [(arguments.host, arguments.port, arguments.paths, arguments.duration)] * \
+                arguments.clients
+            started = time.perf_counter()
+            results = pool.starmap(run_client, client_arguments)
+            elapsed = time.perf_counter() - started
+    finally:
+        stop_server(process)
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    errors = sum(client_errors for _, client_errors in results)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def main():
+    cores = os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="Measure how read throughput scales with the number of workers.")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, cores} - {0}),
+                        help="Worker counts to measure.")
+    parser.add_argument("--clients", type=int, default=max(8, 2 * cores), help="Concurrent client processes.")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds of load for every worker count.")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of warm-up load before measuring.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--path", dest="paths", action="append",
+                        help="Read endpoint to request (repeatable); by default a small dataset is created and read.")
+    parser.add_argument("--seed-patients", type=int, default=100, help="Patients created when no path is given.")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    arguments = parser.parse_args()
+
+    if not arguments.paths:
+        process = start_server(1, arguments.host, arguments.port)
+
+        try:
+            if not wait_until_ready(arguments.host, arguments.port, "/docs", arguments.startup_timeout):
+                raise RuntimeError("The server did not start.")
+
+            arguments.paths = seed_read_paths(arguments.host, arguments.port, arguments.seed_patients)
+        finally:
+            stop_server(process)
+
+    results = [measure(workers, arguments) for workers in arguments.workers]
+    baseline = results[0]["throughput"] / results[0]["workers"]
+
+    print(f"{'workers':>7} {'req/sec':>10} {'speedup':>8} {'efficiency':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+
+    for result in results:
+        speedup = result["throughput"] / results[0]["throughput"]
+        result["efficiency"] = result["throughput"] / (baseline * result["workers"])
+        print(f"{result['workers']:>7} {result['throughput']:>10,.0f} {speedup:>7.2f}x {result['efficiency']:>10.0%} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['errors']:>7}")
+
+    if arguments.output:
+        Path(arguments.output).write_text(json.dumps(results, indent=2))
+
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import os
+import tempfile
+
+# numarul maxim de thread-uri in care se executa apelurile blocante catre MySQL si MongoDB
+DB_THREAD_POOL_SIZE = int(os.environ.get("DB_THREAD_POOL_SIZE", "16"))
+
+# "mysql" - baza de date de productie
+# "sqlite" - fisierul SQLITE_PATH, pentru rulari locale si benchmark-uri fara server MySQL
+SQL_BACKEND = os.environ.get("SQL_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "medicineProject.db")
+
+MYSQL_DATABASE = os.environ.get("MYSQL_DATABASE", "medicineProject")
+MYSQL_USER = os.environ.get("MYSQL_USER", "root")
+MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD", "victor")
+MYSQL_HOST = os.environ.get("MYSQL_HOST", "localhost")
+MYSQL_PORT = int(os.environ.get("MYSQL_PORT", "3306"))
+
+# pool-ul de conexiuni MySQL: numarul maxim de conexiuni deschise, dupa cate secunde o conexiune nefolosita este
+# considerata expirata si cat asteapta un request dupa o conexiune libera
+MYSQL_POOL_MAX_CONNECTIONS = int(os.environ.get("MYSQL_POOL_MAX_CONNECTIONS", "20"))
+MYSQL_POOL_STALE_TIMEOUT = int(os.environ.get("MYSQL_POOL_STALE_TIMEOUT", "300"))
+MYSQL_POOL_WAIT_TIMEOUT = int(os.environ.get("MYSQL_POOL_WAIT_TIMEOUT", "10"))
+
+# migrarile sunt aplicate la pornirea aplicatiei; cand ruleaza mai multe procese worker se dezactiveaza si se aplica o
+# singura data, inainte de pornire, cu "python manage.py migrate" (serve.py face acest lucru automat)
+RUN_MIGRATIONS_ON_STARTUP = os.environ.get("RUN_MIGRATIONS_ON_STARTUP", "1") == "1"
+
+# serverul de productie (serve.py): adresa, portul, numarul de procese worker (implicit cate unul pentru fiecare
+# nucleu) si cate secunde sunt asteptate request-urile in curs la oprire, inainte de inchiderea conexiunilor;
+# fiecare worker are propriul pool MySQL si propriul MongoClient, deci numarul total de conexiuni deschise este
+# WEB_WORKERS * MYSQL_POOL_MAX_CONNECTIONS, respectiv WEB_WORKERS * MONGO_MAX_POOL_SIZE
+WEB_HOST = os.environ.get("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.environ.get("WEB_PORT", "8080"))
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", str(os.cpu_count() or 1)))
+WEB_GRACEFUL_SHUTDOWN_TIMEOUT = int(os.environ.get("WEB_GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+
+# "mongomock://" inlocuieste serverul MongoDB cu o baza de date in memoria procesului (pachetul mongomock), pentru
+# rulari locale si benchmark-uri; este suportat doar de backend-ul "sync"
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DATABASE = os.environ.get("MONGO_DATABASE", "medicineProjectNoSQL")
+
+# un singur MongoClient este folosit de intregul proces; pymongo tine intern un pool de conexiuni per server
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+
+# "sync" - pymongo rulat in pool-ul de thread-uri din Databases/dataAccess.py
+# "async" - clientul asincron pymongo, interogarile sunt asteptate direct pe event loop
+CONSULTATION_BACKEND = os.environ.get("CONSULTATION_BACKEND", "sync")
+
+# paginarea listelor de consultatii
+CONSULTATION_PAGE_SIZE = int(os.environ.get("CONSULTATION_PAGE_SIZE", "50"))
+CONSULTATION_MAX_PAGE_SIZE = int(os.environ.get("CONSULTATION_MAX_PAGE_SIZE", "500"))
+
+# scrierile individuale de consultatii sunt grupate intr-un singur insert_many: lotul este trimis cand ajunge la
+# CONSULTATION_WRITE_BATCH_SIZE documente sau dupa CONSULTATION_WRITE_DELAY_MS de la primul document din lot
+CONSULTATION_WRITE_BATCH_SIZE = int(os.environ.get("CONSULTATION_WRITE_BATCH_SIZE", "100"))
+CONSULTATION_WRITE_DELAY_MS = int(os.environ.get("CONSULTATION_WRITE_DELAY_MS", "5"))
+
+# numarul de consultatii validate si inserate impreuna de endpoint-ul de creare in bloc
+CONSULTATION_BULK_BATCH_SIZE = int(os.environ.get("CONSULTATION_BULK_BATCH_SIZE", "1000"))
+
+# numarul de consultatii citite din cursorul Mongo (si scrise in raspuns) la un pas al exportului NDJSON
+CONSULTATION_EXPORT_BATCH_SIZE = int(os.environ.get("CONSULTATION_EXPORT_BATCH_SIZE", "1000"))
+
+# numarul de pacienti cititi dintr-o singura interogare la exportul CSV/NDJSON
+PATIENT_EXPORT_CHUNK_SIZE = int(os.environ.get("PATIENT_EXPORT_CHUNK_SIZE", "1000"))
+
+# numarul de pacienti inserati cu un singur INSERT (si intr-o singura tranzactie) la importul in bloc
+PATIENT_IMPORT_BATCH_SIZE = int(os.environ.get("PATIENT_IMPORT_BATCH_SIZE", "1000"))
+
+# numarul de programari inserate cu un singur INSERT la crearea in bloc
+APPOINTMENT_BULK_BATCH_SIZE = int(os.environ.get("APPOINTMENT_BULK_BATCH_SIZE", "1000"))
+
+# cate secunde este folosit cache-ul de doctori din memoria fiecarui proces worker inainte de a fi reincarcat
+DOCTOR_CACHE_TTL = float(os.environ.get("DOCTOR_CACHE_TTL", "60"))
+
+# cache-ul LRU pentru pacienti cautati dupa CNP: numarul maxim de intrari (0 dezactiveaza cache-ul), durata de viata
+# in secunde a unei intrari si durata pentru care un CNP inexistent este tinut minte
+PATIENT_CACHE_SIZE = int(os.environ.get("PATIENT_CACHE_SIZE", "10000"))
+PATIENT_CACHE_TTL = float(os.environ.get("PATIENT_CACHE_TTL", "60"))
+PATIENT_CACHE_NEGATIVE_TTL = float(os.environ.get("PATIENT_CACHE_NEGATIVE_TTL", "5"))
+
+# numarul maxim de ETag-uri tinute in memorie pentru programari si conturi si cate secunde este folosit un ETag
+# (0 dezactiveaza raspunsurile 304 fara interogarea bazei de date); serve.py dezactiveaza implicit aceste raspunsuri
+# cand ruleaza mai multe procese worker, pentru ca invalidarile nu ajung la celelalte procese
+ETAG_STORE_SIZE = int(os.environ.get("ETAG_STORE_SIZE", "10000"))
+ETAG_STORE_TTL = float(os.environ.get("ETAG_STORE_TTL", "5"))
+
+# instrumentarea interogarilor: cu QUERY_DEBUG_HEADERS=1 fiecare raspuns primeste antete cu numarul si durata
+# interogarilor MySQL si a comenzilor MongoDB ale request-ului (doar pentru dezvoltare), iar interogarile mai lente
+# decat SLOW_QUERY_THRESHOLD_MS sunt scrise in log impreuna cu ruta (0 dezactiveaza logul)
+QUERY_DEBUG_HEADERS = os.environ.get("QUERY_DEBUG_HEADERS", "0") == "1"
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "200"))
+
+# profilarea la cerere: un request este rulat sub cProfile daca are antetul X-Profile-Token semnat cu PROFILER_SECRET
+# (vezi "python manage.py profile-token") sau, aleator, cu probabilitatea PROFILER_SAMPLE_RATE; cand niciuna nu este
+# configurata middleware-ul nici nu este adaugat; profilurile sunt salvate in PROFILER_DIRECTORY (comun tuturor
+# worker-ilor), se pastreaza ultimele PROFILER_MAX_PROFILES, iar raportul contine PROFILER_TOP_FUNCTIONS functii;
+# profilurile sunt citite tot cu un token semnat, deci PROFILER_SAMPLE_RATE cere si PROFILER_SECRET (altfel aplicatia
+# nu porneste)
+PROFILER_SECRET = os.environ.get("PROFILER_SECRET", "")
+PROFILER_SAMPLE_RATE = float(os.environ.get("PROFILER_SAMPLE_RATE", "0"))
+PROFILER_DIRECTORY = os.environ.get("PROFILER_DIRECTORY", os.path.join(tempfile.gettempdir(),
+                                                                       "medicineProject-profiles"))
+PROFILER_MAX_PROFILES = int(os.environ.get("PROFILER_MAX_PROFILES", "50"))
+PROFILER_TOP_FUNCTIONS = int(os.environ.get("PROFILER_TOP_FUNCTIONS", "30"))
+
+# cu mai multi worker-i fiecare proces salveaza metricile in METRICS_DIRECTORY la fiecare METRICS_FLUSH_INTERVAL
+# secunde, iar /metrics raspunde cu suma valorilor tuturor worker-ilor; serve.py creeaza directorul cand porneste mai
+# multi worker-i, iar fara el /metrics raspunde doar cu valorile procesului curent
+METRICS_DIRECTORY = os.environ.get("METRICS_DIRECTORY", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+
+# paginarea listei de programari
+APPOINTMENT_PAGE_SIZE = int(os.environ.get("APPOINTMENT_PAGE_SIZE", "50"))
+APPOINTMENT_MAX_PAGE_SIZE = int(os.environ.get("APPOINTMENT_MAX_PAGE_SIZE", "500"))
+
+# costul bcrypt (2^rounds iteratii) si numarul de procese in care se calculeaza hash-urile parolelor
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASHING_PROCESSES = int(os.environ.get("PASSWORD_HASHING_PROCESSES", str(os.cpu_count() or 1)))
@@ -1,14 +1,66 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
-from APIs import patientAPI, doctorAPI, appointmentAPI, consultationAPI, accountAPI
+from config import RUN_MIGRATIONS_ON_STARTUP, QUERY_DEBUG_HEADERS
+from APIs import patientAPI, doctorAPI, appointmentAPI, consultationAPI, accountAPI, adminAPI
+from Databases.NoSQL.consultationRepository import consultation_repository
+from Databases.NoSQL.consultationWriteBuffer import consultation_write_buffer
+from Databases.SQL.SQLDatabase import db
+from Databases.SQL.doctorCache import doctor_cache
+from Databases.SQL.patientCache import patient_cache
+from Databases.SQL.migrations import run_migrations
+from Databases.dataAccess import run_in_db_thread, shutdown_db_executor
+from Middleware.dbSessionMiddleware import DatabaseSessionMiddleware
+from Middleware.metricsMiddleware import MetricsMiddleware
+from Middleware.profilerMiddleware import ProfilerMiddleware
+from Middleware.queryDebugMiddleware import QueryDebugMiddleware
+from Utils.jsonResponse import FastJSONResponse
+from Utils.metrics import metrics_snapshot_writer
+from Utils.passwordHashing import shutdown_password_executor
+from Utils.profiling import PROFILING_ENABLED, check_profiler_settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if RUN_MIGRATIONS_ON_STARTUP:
+        await run_in_db_thread(run_migrations)
+
+    await doctor_cache.startup()
+    await patient_cache.startup()
+    await consultation_repository.startup()
+    await metrics_snapshot_writer.startup()
+
+    yield
+
+    await metrics_snapshot_writer.shutdown()
+    await consultation_write_buffer.close()
+    await doctor_cache.shutdown()
+    await patient_cache.shutdown()
+    shutdown_password_executor()
+    shutdown_db_executor()
+    db.close_all()
+    await consultation_repository.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
-app = FastAPI()
+app.add_middleware(DatabaseSessionMiddleware)
+if QUERY_DEBUG_HEADERS:
+    app.add_middleware(QueryDebugMiddleware)
+# fara PROFILER_SECRET si PROFILER_SAMPLE_RATE middleware-ul nu este adaugat, deci nu costa nimic
+if PROFILING_ENABLED:
+    check_profiler_settings()
+    app.add_middleware(ProfilerMiddleware)
+# adaugat ultimul, deci este middleware-ul exterior si masoara si eliberarea conexiunii MySQL
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(patientAPI.router)
 app.include_router(doctorAPI.router)
 app.include_router(appointmentAPI.router)
 app.include_router(consultationAPI.router)
 app.include_router(accountAPI.router)
+app.include_router(adminAPI.router)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8080)
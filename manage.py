@@ -0,0 +1,86 @@
+import argparse
+import sys
+
+from Databases.NoSQL.consultationDatabase import ensure_consultation_indexes, get_consultation_indexes, \
+    find_missing_consultation_indexes
+from Databases.NoSQL.mongoClient import close_mongo_client
+from Databases.SQL.migrations import run_migrations
+from config import PROFILER_SECRET
+from Utils.profiling import create_profile_token
+
+
+def list_indexes(arguments):
+    for name, index in get_consultation_indexes().items():
+        unique = " unique" if index.get("unique", False) else ""
+        keys = ", ".join(f"{field} {direction}" for field, direction in index["key"])
+        print(f"{name}: ({keys}){unique}")
+
+    return 0
+
+
+def verify_indexes(arguments):
+    missing_indexes = find_missing_consultation_indexes(get_consultation_indexes())
+
+    if missing_indexes:
+        print(f"Missing or different indexes: {', '.join(missing_indexes)}")
+        return 1
+
+    print("All consultation indexes are present.")
+    return 0
+
+
+def create_indexes(arguments):
+    created_indexes = ensure_consultation_indexes()
+    print(f"Ensured indexes: {', '.join(created_indexes)}")
+
+    return 0
+
+
+def apply_migrations(arguments):
+    applied_migrations = run_migrations()
+
+    if applied_migrations:
+        print(f"Applied migrations: {', '.join(applied_migrations)}")
+    else:
+        print("The database schema is up to date.")
+
+    return 0
+
+
+def print_profile_token(arguments):
+    if not PROFILER_SECRET:
+        print("PROFILER_SECRET is not set, so the server does not accept profile tokens.")
+        return 1
+
+    # tokenul este trimis in antetul X-Profile-Token; raspunsul contine in X-Profile-Id identificatorul profilului
+    print(create_profile_token(arguments.ttl))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Administrative commands for the medicine project.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    indexes_parser = commands.add_parser("indexes", help="Manage the indexes of the consultatii collection.")
+    indexes_commands = indexes_parser.add_subparsers(dest="action", required=True)
+    indexes_commands.add_parser("list", help="List the existing indexes.").set_defaults(handler=list_indexes)
+    indexes_commands.add_parser("verify", help="Check that all expected indexes exist.").set_defaults(
+        handler=verify_indexes)
+    indexes_commands.add_parser("create", help="Create the missing indexes.").set_defaults(handler=create_indexes)
+
+    commands.add_parser("migrate", help="Apply the pending MySQL migrations.").set_defaults(handler=apply_migrations)
+
+    token_parser = commands.add_parser("profile-token", help="Print a signed X-Profile-Token header value.")
+    token_parser.add_argument("--ttl", type=int, default=600, help="Seconds the token stays valid.")
+    token_parser.set_defaults(handler=print_profile_token)
+
+    arguments = parser.parse_args()
+
+    try:
+        return arguments.handler(arguments)
+    finally:
+        close_mongo_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
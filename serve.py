@@ -0,0 +1,97 @@
+import argparse
+import os
+import shutil
+import socket
+import sys
+import tempfile
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from config import WEB_HOST, WEB_PORT, WEB_WORKERS, WEB_GRACEFUL_SHUTDOWN_TIMEOUT
+from Databases.SQL.SQLDatabase import db
+from Databases.SQL.migrations import run_migrations
+
+
+class ProductionConfig(uvicorn.Config):
+    def bind_socket(self):
+        # cu mai multi worker-i, socket-ul este creat aici fara protocol explicit, iar asyncio nu mai seteaza
+        # TCP_NODELAY pe conexiunile acceptate; raspunsurile pe conexiuni keep-alive ar astepta ~40 ms (Nagle +
+        # delayed ACK), asa ca optiunea este setata pe socket-ul de ascultare si mostenita de conexiuni
+        sock = super().bind_socket()
+
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        return sock
+
+
+def apply_migrations():
+    # migrarile ruleaza o singura data, in procesul principal, inainte ca worker-ii sa porneasca; conexiunea folosita
+    # este inchisa imediat, astfel incat niciun worker nu mosteneste conexiuni deschise
+    try:
+        applied_migrations = run_migrations()
+    finally:
+        db.close_all()
+
+    if applied_migrations:
+        print(f"Applied migrations: {', '.join(applied_migrations)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the medicine project API with several worker processes.")
+    parser.add_argument("--host", default=WEB_HOST, help="Address the server listens on.")
+    parser.add_argument("--port", type=int, default=WEB_PORT, help="Port the server listens on.")
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="Number of worker processes.")
+    parser.add_argument("--graceful-timeout", type=int, default=WEB_GRACEFUL_SHUTDOWN_TIMEOUT,
+                        help="Seconds to wait for in-flight requests when the server stops.")
+    parser.add_argument("--skip-migrations", action="store_true", help="Do not apply the pending migrations.")
+    arguments = parser.parse_args()
+
+    workers = max(1, arguments.workers)
+
+    if not arguments.skip_migrations:
+        apply_migrations()
+
+    # setarile sunt mostenite de worker-i prin variabilele de mediu: worker-ii nu mai aplica migrarile, iar procesele
+    # pentru bcrypt sunt impartite intre worker-i, ca sa nu fie pornite cate un nucleu de procese in fiecare worker
+    os.environ["RUN_MIGRATIONS_ON_STARTUP"] = "0"
+    os.environ.setdefault("PASSWORD_HASHING_PROCESSES", str(max(1, (os.cpu_count() or 1) // workers)))
+
+    # cache-urile din memorie (doctori, pacienti, ETag-uri) sunt ale fiecarui worker, iar invalidarile trec prin
+    # Utils/pubsub.py, care livreaza mesajele doar in procesul care le publica; de aceea fiecare cache are o durata de
+    # viata (DOCTOR_CACHE_TTL, PATIENT_CACHE_TTL, ETAG_STORE_TTL), deci un worker poate citi o valoare modificata de
+    # alt worker cel mult atat timp, iar programarile care refera un doctor sau un pacient sters sunt respinse de
+    # cheile straine; un ETag salvat de un worker ar trimite insa 304 pentru o resursa modificata de alt worker, deci
+    # raspunsurile 304 fara interogarea bazei de date sunt dezactivate implicit cand exista mai multi worker-i
+    if workers > 1:
+        os.environ.setdefault("ETAG_STORE_SIZE", "0")
+
+    # fiecare worker are propriile metrici; o eticheta cu worker-ul nu poate fi stabila (uvicorn inlocuieste procesul
+    # unui worker oprit cu unul nou, fara un index pastrat), iar fara ea fiecare scrape ar primi valorile altui worker
+    # pentru aceleasi serii; de aceea worker-ii isi salveaza valorile intr-un director comun, iar /metrics raspunde cu
+    # suma lor (vezi Utils/metrics.py), la fel cum profilurile sunt impartite prin PROFILER_DIRECTORY
+    metrics_directory = None
+    if workers > 1 and "METRICS_DIRECTORY" not in os.environ:
+        metrics_directory = os.environ["METRICS_DIRECTORY"] = tempfile.mkdtemp(prefix="medicineProject-metrics-")
+
+    # uvicorn porneste worker-ii cu "spawn": fiecare proces importa aplicatia de la zero, iar pool-ul MySQL si
+    # MongoClient-ul sunt create in procesul worker (la prima interogare, respectiv in lifespan), nu copiate din
+    # procesul principal; si un singur worker ruleaza intr-un proces separat, deoarece acest proces a importat deja
+    # config.py inainte ca variabilele de mediu de mai sus sa fie setate; la SIGTERM/SIGINT fiecare worker nu mai
+    # accepta conexiuni noi, asteapta cel mult --graceful-timeout secunde terminarea request-urilor in curs si apoi
+    # ruleaza oprirea din lifespan, care goleste bufferul de consultatii si inchide conexiunile MySQL si MongoDB
+    config = ProductionConfig("main:app", host=arguments.host, port=arguments.port, workers=workers,
+                              timeout_graceful_shutdown=arguments.graceful_timeout)
+
+    try:
+        Multiprocess(config, sockets=[config.bind_socket()]).run()
+    finally:
+        if metrics_directory is not None:
+            shutil.rmtree(metrics_directory, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
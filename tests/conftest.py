@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# configuratia este citita la importul aplicatiei, deci mediul este setat inainte de importul lui main; testele ruleaza
+# pe SQLite si pe stand-in-ul MongoDB din proces, fara servere externe
+os.environ.update({
+    "SQL_BACKEND": "sqlite",
+    "SQLITE_PATH": os.path.join(tempfile.mkdtemp(prefix="medicineProject-tests-"), "medicineProject.db"),
+    "MONGO_URI": "mongomock://",
+    "CONSULTATION_BACKEND": "sync",
+    "QUERY_DEBUG_HEADERS": "1",
+    "SLOW_QUERY_THRESHOLD_MS": "0",
+    "PROFILER_SECRET": "",
+    "PROFILER_SAMPLE_RATE": "0",
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_HASHING_PROCESSES": "1",
+})
+sys.path.insert(0, ROOT)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from APIs.accountAPI import account_etags  # noqa: E402
+from APIs.appointmentAPI import appointment_etags  # noqa: E402
+from Databases.NoSQL.consultationDatabase import get_consultation_collection  # noqa: E402
+from Databases.SQL.SQLDatabase import db, Appointments, Patients, Doctors, Accounts  # noqa: E402
+from Databases.SQL.doctorCache import doctor_cache  # noqa: E402
+from Databases.SQL.patientCache import patient_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    # lifespan-ul aplicatiei (migrari, cache-uri, indecsi MongoDB) ruleaza o singura data pentru toate testele
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def clean_databases(client):
+    yield
+
+    with db.connection_context():
+        for model in (Appointments, Patients, Doctors, Accounts):
+            model.delete().execute()
+
+    get_consultation_collection().delete_many({})
+
+    patient_cache.clear()
+    doctor_cache.load_outside_request()
+    appointment_etags.invalidate_all()
+    account_etags.invalidate_all()
+
+
+def patient_data(index, **fields):
+    return {
+        "cnp": f"19908260456{index:02d}",
+        "lastName": "Cabulea",
+        "firstName": "Victor",
+        "email": f"victor{index}@gmail.com",
+        "phoneNumber": f"07488885{index:02d}",
+        "age": 24,
+        "birthday": "1999-08-26",
+        "is_active": True,
+        **fields,
+    }
+
+
+def doctor_data(index, **fields):
+    return {
+        "last_name": "Dumache",
+        "first_name": "Adrian",
+        "email": f"adrian{index}@yahoo.com",
+        "phone_number": f"07481112{index:02d}",
+        "speciality": "Ortoped",
+        **fields,
+    }
+
+
+def appointment_data(patient_cnp, doctor_id, **fields):
+    return {
+        "id_patient": int(patient_cnp),
+        "id_doctor": doctor_id,
+        "date": "2024-01-01",
+        "status": "Onorata",
+        **fields,
+    }
+
+
+@pytest.fixture
+def patient(client):
+    data = patient_data(1)
+    assert client.post("/api/medicineProject/patients/", json=data).status_code == 201
+
+    return data
+
+
+@pytest.fixture
+def doctor(client):
+    response = client.post("/api/medicineProject/doctors", json=doctor_data(1))
+    assert response.status_code == 201
+
+    return response.json()["doctor"]
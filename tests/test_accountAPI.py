@@ -0,0 +1,23 @@
+ACCOUNT = {"last_name": "Cabulea", "first_name": "Victor", "user_name": "victorc", "user_email": "v@gmail.com",
+           "password": "parola!123"}
+
+
+def test_account_etag_is_invalidated_by_an_update(client):
+    response = client.post("/api/medicineProject/accounts", json=ACCOUNT)
+    assert response.status_code == 201
+
+    url = f"/api/medicineProject/accounts/{response.json()['account']['id']}"
+    etag = client.get(url).headers["etag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(f"{url}/last_name", params={"updated_last_name": "Popescu"})
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["account"]["last_name"] == "Popescu"
+
+
+def test_duplicate_account_email_is_rejected(client):
+    assert client.post("/api/medicineProject/accounts", json=ACCOUNT).status_code == 201
+    assert client.post("/api/medicineProject/accounts", json={**ACCOUNT, "user_name": "victord"}).status_code == 400
@@ -0,0 +1,130 @@
+from conftest import appointment_data
+from Databases.SQL.SQLDatabase import db, Doctors
+
+
+def create_appointments(client, patient, doctor, count):
+    rows = [appointment_data(patient["cnp"], doctor["id"], date=f"2024-01-{day:02d}") for day in range(1, count + 1)]
+    response = client.post("/api/medicineProject/appointments/bulk/", json=rows)
+    assert response.status_code == 201
+    assert response.json()["imported"] == count
+
+
+def count_list_queries(client, **params):
+    # antetul este adaugat de QueryDebugMiddleware (QUERY_DEBUG_HEADERS=1) din interogarile numarate de
+    # QueryTimingMixin.execute_sql
+    response = client.get("/api/medicineProject/appointments/", params=params)
+    assert response.status_code == 200
+
+    return len(response.json()["doctors"]), int(response.headers["x-mysql-queries"])
+
+
+def test_appointment_list_query_count_does_not_depend_on_page_size(client, patient, doctor):
+    create_appointments(client, patient, doctor, 1)
+    _, single_appointment_queries = count_list_queries(client)
+
+    create_appointments(client, patient, doctor, 20)
+    listed, many_appointments_queries = count_list_queries(client, limit=21)
+
+    assert listed == 21
+    assert many_appointments_queries == single_appointment_queries
+
+
+def test_bulk_appointments_report_rows_with_unknown_references(client, patient, doctor):
+    rows = [
+        appointment_data(patient["cnp"], doctor["id"]),
+        appointment_data(patient["cnp"], doctor["id"] + 1000),
+        appointment_data("1990826045699", doctor["id"]),
+        appointment_data(patient["cnp"], doctor["id"], status="Necunoscut"),
+    ]
+
+    response = client.post("/api/medicineProject/appointments/bulk/", json=rows)
+
+    assert response.status_code == 201
+    assert response.json() == {
+        "received": 4,
+        "imported": 1,
+        "failed": 3,
+        "errors": [
+            {"index": 2, "status": 404, "detail": ["Invalid doctor ID"]},
+            {"index": 3, "status": 404, "detail": ["Invalid patient ID"]},
+            {"index": 4, "status": 422, "detail": ["Validation error in input data"]},
+        ],
+    }
+
+
+def test_bulk_appointments_without_created_rows_return_200(client, patient, doctor):
+    response = client.post("/api/medicineProject/appointments/bulk/",
+                           json=[appointment_data(patient["cnp"], doctor["id"] + 1000)])
+
+    assert response.status_code == 200
+    assert response.json()["imported"] == 0
+
+
+def test_appointment_pages_follow_next_links(client, patient, doctor):
+    create_appointments(client, patient, doctor, 5)
+
+    url = "/api/medicineProject/appointments/?limit=2"
+    pages = []
+
+    while url is not None:
+        response = client.get(url)
+        assert response.status_code == 200
+
+        page = response.json()
+        pages.append([appointment["appointment"]["date"] for appointment in page["doctors"]])
+        url = page.get("_links", {}).get("next", {}).get("href")
+
+    assert pages == [["2024-01-01", "2024-01-02"], ["2024-01-03", "2024-01-04"], ["2024-01-05"]]
+
+
+def test_appointment_next_link_keeps_filters(client, patient, doctor):
+    create_appointments(client, patient, doctor, 3)
+
+    response = client.get("/api/medicineProject/appointments/", params={"doctor_id": doctor["id"], "limit": 1})
+
+    assert f"doctor_id={doctor['id']}" in response.json()["_links"]["next"]["href"]
+
+
+def test_appointment_etag_returns_304_until_the_appointment_changes(client, patient, doctor):
+    response = client.post("/api/medicineProject/appointments/", json=appointment_data(patient["cnp"], doctor["id"]))
+    url = f"/api/medicineProject/appointments/{response.json()['appointment']['id']}"
+
+    etag = client.get(url).headers["etag"]
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+    client.put(f"{url}/status", params={"updated_status": "Anulata"})
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["appointment"]["status"] == "Anulata"
+
+    etag = response.headers["etag"]
+    client.delete(url)
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 404
+
+
+def test_appointment_for_a_doctor_deleted_by_another_worker_is_rejected(client, patient, doctor):
+    assert client.get(f"/api/medicineProject/doctors/{doctor['id']}").status_code == 200
+
+    # stergerea facuta direct in baza de date nu invalideaza cache-ul de doctori, ca in cazul altui proces worker
+    with db.connection_context():
+        Doctors.delete_by_id(doctor["id"])
+
+    response = client.post("/api/medicineProject/appointments/", json=appointment_data(patient["cnp"], doctor["id"]))
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Invalid doctor ID"
+
+
+def test_appointment_creation_uses_cached_patient_and_doctor(client, patient, doctor):
+    client.get(f"/api/medicineProject/patients/{patient['cnp']}")
+    client.get(f"/api/medicineProject/doctors/{doctor['id']}")
+
+    response = client.post("/api/medicineProject/appointments/", json=appointment_data(patient["cnp"], doctor["id"]))
+
+    assert response.status_code == 201
+    assert response.headers["x-mysql-queries"] == "1"
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+
+from Databases.NoSQL.consultationDatabase import CONSULTATION_UNIQUE_INDEX, build_consultation_document, \
+    get_consultation_collection
+from Databases.NoSQL.consultationRepository import consultation_repository
+
+
+def consultation_data(patient, doctor, **fields):
+    return {
+        "id_patient": int(patient["cnp"]),
+        "id_doctor": doctor["id"],
+        "date": "2024-01-01",
+        "diagnostic": "Gripa",
+        "investigations": "Analize de sange",
+        **fields,
+    }
+
+
+def test_bulk_consultations_report_duplicates_and_unknown_references(client, patient, doctor):
+    rows = [
+        consultation_data(patient, doctor),
+        consultation_data(patient, doctor),
+        consultation_data(patient, {"id": doctor["id"] + 1000}),
+    ]
+
+    response = client.post("/api/medicineProject/consultations/bulk/", json=rows)
+    report = response.json()
+
+    assert response.status_code == 201
+    assert (report["received"], report["imported"], report["failed"]) == (3, 1, 2)
+    assert [(error["index"], error["status"]) for error in report["errors"]] == [(2, 409), (3, 404)]
+
+
+def test_consultation_pages_follow_next_links(client, patient, doctor):
+    rows = [consultation_data(patient, doctor, date=f"2024-02-{day:02d}") for day in range(1, 6)]
+    client.post("/api/medicineProject/consultations/bulk/", json=rows)
+
+    url = f"/api/medicineProject/consultations/{patient['cnp']}?limit=2"
+    dates = []
+
+    while url is not None:
+        response = client.get(url)
+        assert response.status_code == 200
+
+        page = response.json()
+        links = page.pop("_links", {})
+        dates.extend(consultation["date"] for consultation in page.values())
+        url = links.get("next", {}).get("href")
+
+    assert dates == [f"2024-02-{day:02d}" for day in range(1, 6)]
+
+
+def test_consultation_update_checks_the_new_patient_and_doctor(client, patient, doctor):
+    existing = consultation_data(patient, doctor)
+    client.post("/api/medicineProject/consultations/", json=existing)
+
+    response = client.put("/api/medicineProject/consultations/", json={
+        "existing_consultation": existing,
+        "new_consultation": consultation_data(patient, {"id": doctor["id"] + 1000}),
+    })
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Invalid doctor ID"
+
+    response = client.put("/api/medicineProject/consultations/", json={
+        "existing_consultation": existing,
+        "new_consultation": consultation_data(patient, doctor, diagnostic="Raceala"),
+    })
+
+    assert response.status_code == 204
+
+
+@contextmanager
+def without_unique_index(client):
+    # doua consultatii duplicate (ale altui pacient) impiedica crearea indexului unic la pornire
+    collection = get_consultation_collection()
+    collection.drop_index(CONSULTATION_UNIQUE_INDEX)
+    collection.insert_many([build_consultation_document(1, 1, "2020-01-01", "Gripa", None) for _ in range(2)])
+
+    client.portal.call(consultation_repository.startup)
+    try:
+        assert not consultation_repository.has_unique_index
+        yield
+    finally:
+        collection.delete_many({})
+        client.portal.call(consultation_repository.startup)
+
+    assert consultation_repository.has_unique_index
+
+
+def test_duplicate_consultation_is_rejected_without_the_unique_index(client, patient, doctor):
+    with without_unique_index(client):
+        created = client.post("/api/medicineProject/consultations/", json=consultation_data(patient, doctor))
+        duplicate = client.post("/api/medicineProject/consultations/", json=consultation_data(patient, doctor))
+
+    assert created.status_code == 201
+    assert duplicate.status_code == 409
+
+
+def test_bulk_duplicates_are_rejected_without_the_unique_index(client, patient, doctor):
+    with without_unique_index(client):
+        client.post("/api/medicineProject/consultations/", json=consultation_data(patient, doctor))
+        rows = [consultation_data(patient, doctor), consultation_data(patient, doctor, date="2024-01-02"),
+                consultation_data(patient, doctor, date="2024-01-02")]
+
+        report = client.post("/api/medicineProject/consultations/bulk/", json=rows).json()
+
+    assert report["imported"] == 1
+    assert [(error["index"], error["status"]) for error in report["errors"]] == [(1, 409), (3, 409)]
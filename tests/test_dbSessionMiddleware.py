@@ -0,0 +1,30 @@
+import threading
+import time
+
+from config import DB_THREAD_POOL_SIZE
+from Databases.SQL.SQLDatabase import get_pool_stats
+from Databases.dataAccess import get_db_executor
+
+
+def test_busy_db_thread_pool_does_not_delay_routes_without_mysql(client):
+    release = threading.Event()
+    executor = get_db_executor()
+    jobs = [executor.submit(release.wait, 10) for _ in range(DB_THREAD_POOL_SIZE)]
+
+    try:
+        start = time.perf_counter()
+        response = client.get("/metrics")
+        duration = time.perf_counter() - start
+    finally:
+        release.set()
+        for job in jobs:
+            job.result()
+
+    assert response.status_code == 200
+    assert duration < 1
+
+
+def test_connection_is_returned_to_the_pool_after_a_mysql_request(client, doctor):
+    assert client.get("/api/medicineProject/doctors/", params={"last_name": "Dumache",
+                                                               "first_name": "Adrian"}).status_code == 200
+    assert get_pool_stats()["in_use"] == 0
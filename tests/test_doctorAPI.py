@@ -0,0 +1,33 @@
+from conftest import doctor_data
+
+
+def test_doctor_etag_returns_304(client, doctor):
+    url = f"/api/medicineProject/doctors/{doctor['id']}"
+    etag = client.get(url).headers["etag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_doctor_cache_is_invalidated_by_an_update(client, doctor):
+    client.post("/api/medicineProject/doctors", json=doctor_data(2, speciality="Cardiolog"))
+    url = f"/api/medicineProject/doctors/{doctor['id']}"
+
+    assert client.get("/api/medicineProject/doctors/", params={"speciality": "Cardiolog"}).status_code == 200
+    assert len(client.get("/api/medicineProject/doctors/", params={"speciality": "Cardiolog"}).json()) == 1
+
+    client.put(f"{url}/speciality", params={"updated_speciality": "Cardiolog"})
+
+    assert client.get(url).json()["doctor"]["speciality"] == "Cardiolog"
+    assert len(client.get("/api/medicineProject/doctors/", params={"speciality": "Cardiolog"}).json()) == 2
+    assert client.get("/api/medicineProject/doctors/", params={"speciality": "Ortoped"}).status_code == 404
+
+
+def test_deleted_doctor_is_not_served_from_the_cache(client, doctor):
+    url = f"/api/medicineProject/doctors/{doctor['id']}"
+
+    assert client.get(url).status_code == 200
+
+    client.delete(url)
+
+    assert client.get(url).status_code == 404
@@ -0,0 +1,38 @@
+import json
+
+from Utils.metrics import MetricsRegistry, render_shared_metrics
+
+
+def record_requests(count, duration):
+    registry = MetricsRegistry()
+
+    for _ in range(count):
+        registry.observe_request("GET", "/api/medicineProject/doctors/{doctor_id}", 200, duration, duration / 2, 0)
+
+    return registry
+
+
+def test_shared_metrics_add_the_values_of_every_worker(tmp_path):
+    # fisierul salvat de alt proces worker
+    (tmp_path / "other-worker.json").write_text(json.dumps(record_requests(2, 0.02).snapshot()))
+
+    rendered = render_shared_metrics(tmp_path, record_requests(3, 0.2).snapshot())
+    lines = rendered.splitlines()
+
+    route = 'method="GET",route="/api/medicineProject/doctors/{doctor_id}"'
+    assert f'http_requests_total{{{route},status="200"}} 5' in lines
+    assert f'http_request_duration_seconds_bucket{{{route},le="0.025"}} 2' in lines
+    assert f'http_request_duration_seconds_bucket{{{route},le="0.25"}} 5' in lines
+    assert f"http_request_duration_seconds_count{{{route}}} 5" in lines
+    assert f'http_request_db_duration_seconds_count{{{route},database="mysql"}} 5' in lines
+
+
+def test_metrics_of_the_current_worker_are_replaced_not_added(tmp_path):
+    registry = record_requests(1, 0.01)
+    render_shared_metrics(tmp_path, registry.snapshot())
+
+    registry.observe_request("GET", "/api/medicineProject/doctors/{doctor_id}", 200, 0.01, 0, 0)
+    rendered = render_shared_metrics(tmp_path, registry.snapshot())
+
+    assert 'http_requests_total{method="GET",route="/api/medicineProject/doctors/{doctor_id}",status="200"} 2' \
+        in rendered.splitlines()
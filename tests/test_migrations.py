@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# migrarile sunt rulate intr-un proces separat, pe o baza de date noua, deoarece conexiunea este aleasa la importul
+# modulului Databases.SQL.SQLDatabase
+MIGRATION_SCRIPT = """
+import json
+from Databases.SQL.migrations import run_migrations
+from Databases.SQL.SQLDatabase import db
+
+applied = [run_migrations(), run_migrations()]
+
+with db.connection_context():
+    indexes = {table: sorted(index.name for index in db.get_indexes(table) if index.unique)
+               for table in ("doctors", "patients", "accounts")}
+    password = [column.data_type for column in db.get_columns("accounts") if column.name == "password"]
+
+print(json.dumps({"applied": applied, "indexes": indexes, "password": password}))
+"""
+
+
+def run_migration_script(tmp_path):
+    environment = {**os.environ, "SQL_BACKEND": "sqlite", "SQLITE_PATH": str(tmp_path / "migrations.db")}
+    result = subprocess.run([sys.executable, "-c", MIGRATION_SCRIPT], cwd=ROOT, env=environment,
+                            capture_output=True, text=True, check=True)
+
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_fresh_database_applies_every_migration_once(tmp_path):
+    result = run_migration_script(tmp_path)
+
+    assert result["applied"] == [
+        ["0 initial_schema", "1 appointment_listing_indexes", "2 widen_account_password", "3 unique_contact_indexes"],
+        [],
+    ]
+    assert result["indexes"] == {
+        "doctors": ["doctors_email", "doctors_phone_number"],
+        "patients": ["patients_email", "patients_phoneNumber", "sqlite_autoindex_patients_1"],
+        "accounts": ["accounts_user_email"],
+    }
+    assert result["password"] == ["VARCHAR(60)"]
@@ -0,0 +1,53 @@
+import json
+
+from conftest import patient_data
+
+
+def test_patient_import_reports_duplicate_rows(client, patient):
+    rows = [
+        patient_data(2),
+        patient_data(3, cnp=patient["cnp"]),
+        patient_data(4, email="victor2@gmail.com"),
+        patient_data(5, age="unknown"),
+    ]
+
+    response = client.post("/api/medicineProject/patients/import/", json=rows)
+    report = response.json()
+
+    assert response.status_code == 201
+    assert (report["received"], report["imported"], report["failed"]) == (4, 1, 3)
+    assert [(error["index"], error["status"]) for error in report["errors"]] == [(2, 409), (3, 409), (4, 422)]
+    assert report["errors"][0]["detail"] == ["A patient with this cnp already exists"]
+
+
+def test_patient_import_accepts_ndjson(client):
+    body = "\n".join(json.dumps(patient_data(index)) for index in (1, 2))
+
+    response = client.post("/api/medicineProject/patients/import/", content=body,
+                           headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 201
+    assert response.json()["imported"] == 2
+
+
+def test_imported_patient_replaces_a_cached_missing_patient(client):
+    url = f"/api/medicineProject/patients/{patient_data(2)['cnp']}"
+
+    assert client.get(url).status_code == 404
+
+    client.post("/api/medicineProject/patients/import/", json=[patient_data(2)])
+
+    assert client.get(url).status_code == 200
+
+
+def test_patient_etag_is_invalidated_by_an_update(client, patient):
+    url = f"/api/medicineProject/patients/{patient['cnp']}"
+    etag = client.get(url).headers["etag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(f"{url}/is_active", params={"updated_is_active": False})
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["patient"]["is_active"] is False
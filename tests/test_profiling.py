@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def import_app(**settings):
+    environment = {**os.environ, **settings}
+
+    return subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, env=environment, capture_output=True,
+                          text=True)
+
+
+def test_sampling_without_a_secret_is_refused_at_startup():
+    result = import_app(PROFILER_SAMPLE_RATE="0.5", PROFILER_SECRET="")
+
+    assert result.returncode != 0
+    assert "PROFILER_SAMPLE_RATE requires PROFILER_SECRET" in result.stderr
+
+
+def test_sampling_with_a_secret_starts():
+    result = import_app(PROFILER_SAMPLE_RATE="0.5", PROFILER_SECRET="secret")
+
+    assert result.returncode == 0, result.stderr